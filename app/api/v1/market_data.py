@@ -331,19 +331,13 @@ async def get_chart_data(
         date_start = date_start_ist
         date_end = date_end_ist
         
-        # Query database
-        collection = get_collection("tick_data")
-        cursor = collection.find({
-            'symbol': symbol.upper(),
-            'received_at': {
-                '$gte': date_start,
-                '$lt': date_end
-            }
-        }).sort('received_at', 1)
+        # Query database - charts tolerate replication lag, so read from a secondary when available
+        from ...services.tick_data_service import tick_data_service
+        ticks = tick_data_service.get_ticks_stream(symbol, date_start, date_end, secondary_ok=True)
         
         # Fetch tick data
         tick_data = []
-        async for doc in cursor:
+        async for doc in ticks:
             tick_data.append({
                 'price': doc.get('price'),
                 'timestamp': doc.get('received_at'),  # Use received_at for accurate timing
@@ -391,15 +385,8 @@ async def get_chart_data(
             
             market_hour_ticks += 1
             
-            # Round to interval boundary
-            interval_start_ist = tick_time_ist.replace(
-                minute=(tick_time_ist.minute // interval_minutes) * interval_minutes,
-                second=0,
-                microsecond=0
-            )
-            
-            # Convert to Unix timestamp for chart
-            unix_timestamp = TimezoneUtils.ist_to_unix_timestamp(interval_start_ist)
+            # Round to interval boundary, as a Unix timestamp for the chart
+            unix_timestamp = TimezoneUtils.ist_interval_start_unix(tick_time_ist, interval_minutes)
             
             if unix_timestamp not in interval_data:
                 interval_data[unix_timestamp] = {
@@ -584,22 +571,19 @@ async def get_market_overview():
             }
         }
         
-        # Get latest data for key indices
+        # Get latest data for key indices - one aggregation for all symbols
+        latest_by_symbol = await tick_data_service.get_latest_tick_per_symbol(key_indices)
         for symbol in key_indices:
-            try:
-                latest_ticks = await tick_data_service.get_latest_ticks(symbol=symbol, limit=1)
-                if latest_ticks:
-                    tick = latest_ticks[0]
-                    overview_data["indices"].append({
-                        "symbol": symbol,
-                        "price": tick.get("price", 0),
-                        "timestamp": tick.get("timestamp", ""),
-                        "exchange": tick.get("exchange", "NSE")
-                    })
-                    if not overview_data["summary"]["last_update"]:
-                        overview_data["summary"]["last_update"] = tick.get("timestamp", "")
-            except Exception as e:
-                logger.warning(f"Error getting data for {symbol}: {e}")
+            tick = latest_by_symbol.get(symbol.upper())
+            if tick:
+                overview_data["indices"].append({
+                    "symbol": symbol,
+                    "price": tick.get("price", 0),
+                    "timestamp": tick.get("timestamp", ""),
+                    "exchange": tick.get("exchange", "NSE")
+                })
+                if not overview_data["summary"]["last_update"]:
+                    overview_data["summary"]["last_update"] = tick.get("timestamp", "")
         
         # Get symbol count from tick data
         tick_collection = tick_data_service._get_collection()
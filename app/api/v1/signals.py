@@ -11,7 +11,8 @@ from datetime import datetime, timedelta
 
 from ...services.signal_detection_service import signal_detection_service
 from ...models.signal import SignalModel, SignalType, SignalStrength
-from ...utils.timezone_utils import TimezoneUtils
+from ...utils.timezone_utils import TimezoneUtils, IST
+from ...utils.signal_format import breakout_direction, breakout_reason, breakout_display_text
 import motor.motor_asyncio
 
 logger = logging.getLogger(__name__)
@@ -274,7 +275,7 @@ async def get_signal_history(
                     'id': signal_doc.get('id', str(signal_doc.get('_id', ''))),
                     'session_name': signal_doc.get('session_name'),
                     'signal_type': signal_doc.get('signal_type'),
-                    'reason': signal_doc.get('reason'),
+                    'reason': breakout_reason(signal_doc),
                     'timestamp': signal_doc.get('timestamp'),
                     'nifty_price': signal_doc.get('nifty_price'),
                     'future_price': signal_doc.get('future_price'),
@@ -287,8 +288,10 @@ async def get_signal_history(
                     'status': signal_doc.get('status'),
                     'session_high': signal_doc.get('session_high'),
                     'session_low': signal_doc.get('session_low'),
+                    'breakout_type': signal_doc.get('breakout_type'),
+                    'breakout_amount': signal_doc.get('breakout_amount'),
                     'created_at': signal_doc.get('created_at'),
-                    'display_text': signal_doc.get('display_text')
+                    'display_text': breakout_display_text(signal_doc)
                 }
                 signals.append(signal_data)
             
@@ -555,10 +558,8 @@ async def get_monitoring_status():
     Returns whether the signal detection service is currently running
     """
     try:
-        import pytz
         import pymongo
         
-        IST = pytz.timezone('Asia/Kolkata')
         current_time = datetime.now(IST)
         
         # Check if monitoring is active
@@ -597,7 +598,7 @@ async def get_monitoring_status():
                     
                     # Convert to IST if needed
                     if signal_dt.tzinfo is None:
-                        signal_dt_ist = IST.localize(signal_dt)
+                        signal_dt_ist = signal_dt.replace(tzinfo=IST)
                     else:
                         signal_dt_ist = signal_dt.astimezone(IST)
                     
@@ -674,9 +675,6 @@ async def get_chart_signals(
     Returns signals with exact timestamps and prices for chart overlay
     """
     try:
-        import pytz
-        IST = pytz.timezone('Asia/Kolkata')
-        
         # Parse date
         if not date:
             target_date = datetime.now(IST).date()
@@ -694,18 +692,10 @@ async def get_chart_signals(
             
             # Get signal timestamp
             if signal.get('timestamp'):
-                if isinstance(signal['timestamp'], str):
-                    signal_dt = datetime.fromisoformat(signal['timestamp'].replace('Z', '+00:00'))
-                else:
-                    signal_dt = signal['timestamp']
-                
-                # Convert to IST if needed
-                if signal_dt.tzinfo is None:
-                    # Treat naive datetime as IST (not UTC)
-                    signal_dt_ist = IST.localize(signal_dt)
-                else:
-                    signal_dt_ist = signal_dt.astimezone(IST)
-                signal_date = signal_dt_ist.date()
+                # Naive datetimes are treated as IST (not UTC), aware ones converted
+                signal_dt_ist = TimezoneUtils.to_ist(signal['timestamp'])
+                if signal_dt_ist:
+                    signal_date = signal_dt_ist.date()
             
             # Check if signal matches our criteria
             if (signal_date == target_date and 
@@ -721,8 +711,8 @@ async def get_chart_signals(
                     'price': signal.get('nifty_price') if symbol == 'NIFTY' else signal.get('future_price'),
                     'confidence': signal.get('confidence', 50),
                     'session_name': signal.get('session_name'),
-                    'reason': signal.get('reason', ''),
-                    'breakout_type': 'HIGH' if 'high' in signal.get('reason', '').lower() else 'LOW',
+                    'reason': breakout_reason(signal),
+                    'breakout_type': breakout_direction(signal),
                     'vwap': signal.get('vwap_nifty') if symbol == 'NIFTY' else signal.get('vwap_future'),
                     'session_high': signal.get('session_high'),
                     'session_low': signal.get('session_low'),
@@ -792,9 +782,6 @@ async def get_signals_with_breakout_details(
     Shows exact NIFTY and Future breakout conditions instead of just arrows
     """
     try:
-        import pytz
-        IST = pytz.timezone('Asia/Kolkata')
-        
         # Parse date - default to today if not provided
         if not date:
             target_date = datetime.now(IST).date()
@@ -816,17 +803,10 @@ async def get_signals_with_breakout_details(
             # Get signal timestamp - try both timestamp and created_at fields
             signal_timestamp = signal.get('timestamp') or signal.get('created_at')
             if signal_timestamp:
-                if isinstance(signal_timestamp, str):
-                    signal_dt = datetime.fromisoformat(signal_timestamp.replace('Z', '+00:00'))
-                else:
-                    signal_dt = signal_timestamp
-                
-                if signal_dt.tzinfo is None:
-                    # Treat naive datetime as IST (not UTC)
-                    signal_dt_ist = IST.localize(signal_dt)
-                else:
-                    signal_dt_ist = signal_dt.astimezone(IST)
-                signal_date = signal_dt_ist.date()
+                # Naive datetimes are treated as IST (not UTC), aware ones converted
+                signal_dt_ist = TimezoneUtils.to_ist(signal_timestamp)
+                if signal_dt_ist:
+                    signal_date = signal_dt_ist.date()
             
             # Include only signals from the target date
             if signal_date == target_date:
@@ -863,7 +843,7 @@ async def get_signals_with_breakout_details(
             
             # Add breakout visualization data - handle None values safely
             breakout_details = enhanced_signal.get('breakout_details') or {}
-            display_text = enhanced_signal.get('display_text', '')
+            display_text = breakout_display_text(enhanced_signal)
             
             # Safely get breakout status
             nifty_breaks_high = breakout_details.get('nifty_breaks_high', False) if isinstance(breakout_details, dict) else False
@@ -1119,9 +1099,6 @@ async def get_signals_by_session(
     Returns signals organized by session for clearer analysis
     """
     try:
-        import pytz
-        IST = pytz.timezone('Asia/Kolkata')
-        
         # Parse date
         if not date:
             target_date = datetime.now(IST).date()
@@ -1145,17 +1122,10 @@ async def get_signals_by_session(
             # Get signal timestamp - try both timestamp and created_at fields
             signal_timestamp = signal.get('timestamp') or signal.get('created_at')
             if signal_timestamp:
-                if isinstance(signal_timestamp, str):
-                    signal_dt = datetime.fromisoformat(signal_timestamp.replace('Z', '+00:00'))
-                else:
-                    signal_dt = signal_timestamp
-                
-                if signal_dt.tzinfo is None:
-                    # Treat naive datetime as IST (not UTC)
-                    signal_dt_ist = IST.localize(signal_dt)
-                else:
-                    signal_dt_ist = signal_dt.astimezone(IST)
-                signal_date = signal_dt_ist.date()
+                # Naive datetimes are treated as IST (not UTC), aware ones converted
+                signal_dt_ist = TimezoneUtils.to_ist(signal_timestamp)
+                if signal_dt_ist:
+                    signal_date = signal_dt_ist.date()
             
             # Filter by date if specified
             if signal_date == target_date:
@@ -1294,10 +1264,8 @@ async def get_today_signals():
     Get today's signals ONLY - filtered endpoint for current day data
     """
     try:
-        import pytz
         import pymongo
         
-        IST = pytz.timezone('Asia/Kolkata')
         current_time = datetime.now(IST)
         today = current_time.date()
         
@@ -1323,7 +1291,7 @@ async def get_today_signals():
                 
                 # Convert to IST if needed
                 if signal_dt.tzinfo is None:
-                    signal_dt_ist = IST.localize(signal_dt)
+                    signal_dt_ist = signal_dt.replace(tzinfo=IST)
                 else:
                     signal_dt_ist = signal_dt.astimezone(IST)
                 
@@ -1441,6 +1409,14 @@ async def get_signal_performance():
         confidences = [s.get('confidence', 50) for s in signals]
         avg_confidence = sum(confidences) / len(confidences) if confidences else 0
         
+        # Signals in the last 24 hours - timestamps normalized to naive IST once each
+        last_24h_cutoff = TimezoneUtils.get_ist_now() - timedelta(hours=24)
+        last_24h_signals = 0
+        for s in signals:
+            signal_dt_ist = TimezoneUtils.to_ist(s.get('timestamp'))
+            if signal_dt_ist and signal_dt_ist >= last_24h_cutoff:
+                last_24h_signals += 1
+        
         performance_data = {
             'total_signals': total_signals,
             'active_signals': active_signals,
@@ -1449,14 +1425,7 @@ async def get_signal_performance():
             'session_distribution': session_distribution,
             'confidence_distribution': confidence_distribution,
             'average_confidence': round(avg_confidence, 2),
-            'last_24h_signals': len([s for s in signals 
-                                   if s.get('timestamp') and 
-                                   (lambda dt: (TimezoneUtils.get_ist_now() - dt.replace(tzinfo=None)).total_seconds() <= 86400)(
-                                       datetime.fromisoformat(
-                                           s['timestamp'].replace('Z', '+00:00') if isinstance(s['timestamp'], str) 
-                                           else s['timestamp'].isoformat()
-                                       )
-                                   )])
+            'last_24h_signals': last_24h_signals
         }
         
         return JSONResponse(
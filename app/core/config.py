@@ -24,7 +24,11 @@ except ImportError:
 class Settings(BaseSettings):
     # MongoDB Configuration
     mongodb_url: str = os.getenv("MONGODB_URL", "")
+    mongodb_fallback_url: str = os.getenv("MONGODB_FALLBACK_URL", "")  # Tried if mongodb_url fails
+    mongodb_min_pool_size: int = 5
+    mongodb_max_pool_size: int = 50
     database_name: str = "trading_signals"
+    tick_data_retention_days: int = 7  # Enforced by a TTL index on tick_data.received_at
     
     # JWT Configuration
     secret_key: str = "your-secret-key-here-make-it-long-and-secure"
@@ -36,6 +40,11 @@ class Settings(BaseSettings):
     debug: bool = False
     environment: str = "production"
     
+    # WebSocket Configuration
+    # Per-symbol price_update coalescing window. 0 (default) sends every tick; when
+    # enabled, subscribers only get the latest price per symbol per window
+    ws_price_coalesce_ms: int = int(os.getenv("WS_PRICE_COALESCE_MS", "0"))
+    
     # CORS Configuration
     allowed_origins: List[str] = ["http://localhost:3000", "http://localhost:3001", "http://localhost:3002", "http://localhost:5173"]
     
@@ -4,12 +4,14 @@ This file contains all trading symbols and tokens used throughout the applicatio
 Update symbols/tokens here to reflect changes across the entire system.
 """
 
-from typing import Dict, List, Any
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 
-@dataclass
+@dataclass(frozen=True)
 class TradingSymbol:
-    """Represents a trading symbol with all its properties"""
+    """Represents a trading symbol with all its properties (immutable - shared via SymbolsConfig)"""
     symbol: str
     token: str
     name: str
@@ -41,16 +43,22 @@ class SymbolsConfig:
         expiry="2025-08-28"
     )
     
-    # List of all active symbols (for easy iteration)
+    # Symbols are fixed at import, so the derived collections below are built
+    # once and shared - as tuples and read-only mappings, so no caller can
+    # change them for everyone else
+    
+    # All active symbols (for easy iteration)
     @classmethod
-    def get_all_symbols(cls) -> List[TradingSymbol]:
+    @lru_cache(maxsize=None)
+    def get_all_symbols(cls) -> Tuple[TradingSymbol, ...]:
         """Get all active trading symbols"""
-        return [cls.NIFTY_INDEX, cls.NIFTY_FUTURES]
+        return (cls.NIFTY_INDEX, cls.NIFTY_FUTURES)
     
     @classmethod
-    def get_symbol_names(cls) -> List[str]:
-        """Get list of symbol names"""
-        return [symbol.symbol for symbol in cls.get_all_symbols()]
+    @lru_cache(maxsize=None)
+    def get_symbol_names(cls) -> Tuple[str, ...]:
+        """Get symbol names"""
+        return tuple(symbol.symbol for symbol in cls.get_all_symbols())
     
     @classmethod
     def get_tokens(cls) -> List[str]:
@@ -76,24 +84,26 @@ class SymbolsConfig:
         return token_map.get(token)
     
     @classmethod
-    def get_token_to_symbol_map(cls) -> Dict[str, str]:
-        """Get token to symbol name mapping"""
-        return {
+    @lru_cache(maxsize=None)
+    def get_token_to_symbol_map(cls) -> Mapping[str, str]:
+        """Get token to symbol name mapping (read-only)"""
+        return MappingProxyType({
             cls.NIFTY_INDEX.token: cls.NIFTY_INDEX.symbol,
             cls.NIFTY_FUTURES.token: cls.NIFTY_FUTURES.symbol
-        }
+        })
     
     @classmethod
-    def get_symbol_to_token_map(cls) -> Dict[str, str]:
-        """Get symbol name to token mapping"""
-        return {
+    @lru_cache(maxsize=None)
+    def get_symbol_to_token_map(cls) -> Mapping[str, str]:
+        """Get symbol name to token mapping (read-only)"""
+        return MappingProxyType({
             cls.NIFTY_INDEX.symbol: cls.NIFTY_INDEX.token,
             cls.NIFTY_FUTURES.symbol: cls.NIFTY_FUTURES.token
-        }
+        })
     
     @classmethod
     def get_market_tokens(cls) -> List[Dict[str, Any]]:
-        """Get market tokens in Angel One API format"""
+        """Get market tokens in Angel One API format - a fresh list, since it is handed to the SDK"""
         return [
             {
                 "exchangeType": cls.NIFTY_INDEX.exchange_type,
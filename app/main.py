@@ -22,6 +22,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Strong references to startup tasks - the event loop only keeps weak ones,
+# so an unreferenced task can be garbage collected mid-run
+_background_tasks = set()
+
+
+def _on_background_task_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Background task {task.get_name()} died: {task.exception()!r}")
+
+
+def spawn_background_task(coro, name: str) -> asyncio.Task:
+    """Start a long-lived background task, keeping a reference and logging if it dies"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
@@ -86,19 +104,19 @@ async def startup_db_client():
         
         # Step 2: Start Angel One service (but don't wait for it to fully complete)
         logger.info("📈 Starting Angel One service...")
-        asyncio.create_task(angel_one_service.start_feed_service())
+        spawn_background_task(angel_one_service.start_feed_service(), "angel_one_feed")
         
         # Step 3: Start WebSocket queue processor
         logger.info("🔄 Starting WebSocket queue processor...")
-        asyncio.create_task(angel_one_service.process_ws_queue())
+        spawn_background_task(supervise_ws_queue(), "ws_queue_processor")
         
         # Step 4: Start signal detection service with safe initialization
         logger.info("🎯 Starting signal detection service...")
-        asyncio.create_task(safe_start_signal_detection())
+        spawn_background_task(safe_start_signal_detection(), "signal_detection_start")
         
         # Step 5: Start monitoring service
         logger.info("📊 Starting monitoring service...")
-        asyncio.create_task(start_monitoring_service())
+        spawn_background_task(start_monitoring_service(), "monitoring_service")
         
         logger.info("✅ All services started successfully")
         
@@ -107,6 +125,16 @@ async def startup_db_client():
         # Don't crash the server, just log the error
 
 
+async def supervise_ws_queue():
+    """Run the WebSocket queue processor, restarting it if it crashes"""
+    while not angel_one_service.shutdown_flag:
+        try:
+            await angel_one_service.process_ws_queue()
+        except Exception as e:
+            logger.error(f"❌ WebSocket queue processor crashed, restarting: {e}")
+            await asyncio.sleep(1)
+
+
 async def safe_start_signal_detection():
     """Safely start signal detection service with retry logic"""
     max_retries = 3
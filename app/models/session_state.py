@@ -3,8 +3,9 @@ Session State Model for Database-Backed Session Monitoring
 """
 
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from enum import Enum
+from bson import ObjectId
 from pydantic import BaseModel, Field
 
 
@@ -30,6 +31,8 @@ class SessionState(BaseModel):
     session_name: str = Field(..., description="Session name (e.g., 'Morning Opening')")
     start_time: str = Field(..., description="Session start time in HH:MM format")
     end_time: str = Field(..., description="Session end time in HH:MM format")
+    start_minutes: int = Field(..., description="Session start as minutes since midnight")
+    end_minutes: int = Field(..., description="Session end as minutes since midnight")
     
     # Session Status
     status: SessionStatus = SessionStatus.PENDING
@@ -74,20 +77,31 @@ class SessionStateService:
         ]
         
         for session in sessions:
+            start_hour, start_minute = map(int, session["start"].split(':'))
+            end_hour, end_minute = map(int, session["end"].split(':'))
+            
             session_state = SessionState(
                 trading_date=trading_date,
                 session_name=session["name"],
                 start_time=session["start"],
-                end_time=session["end"]
+                end_time=session["end"],
+                start_minutes=start_hour * 60 + start_minute,
+                end_minutes=end_hour * 60 + end_minute
             )
+            session_doc = session_state.dict()
+            minute_fields = {
+                "start_minutes": session_doc.pop("start_minutes"),
+                "end_minutes": session_doc.pop("end_minutes")
+            }
             
-            # Upsert - don't overwrite existing sessions
+            # Upsert - don't overwrite existing sessions, but backfill the
+            # integer minute fields on sessions created before they existed
             await self._get_collection().update_one(
                 {
                     "trading_date": trading_date,
                     "session_name": session["name"]
                 },
-                {"$setOnInsert": session_state.dict()},
+                {"$setOnInsert": session_doc, "$set": minute_fields},
                 upsert=True
             )
     
@@ -100,15 +114,41 @@ class SessionStateService:
         
         return await cursor.to_list(length=None)
     
-    async def get_sessions_for_breakout_check(self, trading_date: str) -> List[Dict]:
-        """Get completed sessions that haven't been checked for breakouts"""
-        cursor = self._get_collection().find({
-            "trading_date": trading_date,
-            "status": "COMPLETED",
-            "breakouts_checked": False
-        })
+    async def get_loop_work(self, trading_date: str) -> Tuple[List[Dict], List[Dict]]:
+        """Get sessions to process and sessions due a breakout check in one round trip
         
-        return await cursor.to_list(length=None)
+        Only the fields the monitoring loop reads are returned - in particular
+        the breakout facet carries just the NIFTY session high/low rather than
+        the whole symbols_data blob.
+        """
+        from ..core.symbols import SymbolsConfig
+        nifty_data = f"symbols_data.{SymbolsConfig.NIFTY_INDEX.symbol}"
+        
+        pipeline = [
+            {"$match": {"trading_date": trading_date}},
+            {"$facet": {
+                "process": [
+                    {"$match": {"status": {"$in": ["PENDING", "ACTIVE"]}}},
+                    {"$project": {
+                        "session_name": 1, "trading_date": 1, "status": 1,
+                        "start_time": 1, "end_time": 1,
+                        "start_minutes": 1, "end_minutes": 1
+                    }}
+                ],
+                "breakouts": [
+                    {"$match": {"status": "COMPLETED", "breakouts_checked": False}},
+                    {"$project": {
+                        "session_name": 1, "status": 1, "breakouts_checked": 1,
+                        f"{nifty_data}.high": 1, f"{nifty_data}.low": 1
+                    }}
+                ]
+            }}
+        ]
+        
+        results = await self._get_collection().aggregate(pipeline).to_list(length=1)
+        if not results:
+            return [], []
+        return results[0]["process"], results[0]["breakouts"]
     
     async def update_session_status(self, session_id: str, status: str, additional_data: Dict = None) -> None:
         """Update session status atomically"""
@@ -121,14 +161,14 @@ class SessionStateService:
             update_data.update(additional_data)
         
         await self._get_collection().update_one(
-            {"_id": session_id},
+            {"_id": ObjectId(session_id)},
             {"$set": update_data}
         )
     
     async def update_session_data(self, session_id: str, symbols_data: Dict) -> None:
         """Update session symbol data"""
         await self._get_collection().update_one(
-            {"_id": session_id},
+            {"_id": ObjectId(session_id)},
             {
                 "$set": {
                     "symbols_data": symbols_data,
@@ -148,7 +188,7 @@ class SessionStateService:
             update_data["signals_generated"] = signal_ids
             
         await self._get_collection().update_one(
-            {"_id": session_id},
+            {"_id": ObjectId(session_id)},
             {"$set": update_data}
         )
     
@@ -181,27 +221,33 @@ class SessionStateService:
         
         tick_collection = get_collection("tick_data")
         
-        for symbol in symbols:
-            # Query tick data for this session
-            cursor = tick_collection.find({
-                "symbol": symbol,
+        # Reduce ticks to high/low/count inside MongoDB - one round trip for
+        # all symbols and no per-tick documents shipped back to Python
+        pipeline = [
+            {"$match": {
+                "symbol": {"$in": symbols},
                 "received_at": {
                     "$gte": start_dt,
                     "$lt": end_dt
                 }
-            }).sort("received_at", 1)
-            
-            ticks = await cursor.to_list(length=None)
-            
-            if ticks:
-                prices = [tick["price"] for tick in ticks]
-                symbols_data[symbol] = SymbolData(
-                    high=max(prices),
-                    low=min(prices),
-                    tick_count=len(ticks),
-                    first_tick_time=ticks[0]["received_at"],
-                    last_tick_time=ticks[-1]["received_at"]
-                ).dict()
+            }},
+            {"$group": {
+                "_id": "$symbol",
+                "high": {"$max": "$price"},
+                "low": {"$min": "$price"},
+                "tick_count": {"$sum": 1},
+                "first_tick_time": {"$min": "$received_at"},
+                "last_tick_time": {"$max": "$received_at"}
+            }}
+        ]
+        
+        aggregates = {}
+        async for doc in tick_collection.aggregate(pipeline):
+            aggregates[doc.pop("_id")] = doc
+        
+        for symbol in symbols:
+            if symbol in aggregates:
+                symbols_data[symbol] = SymbolData(**aggregates[symbol]).dict()
             else:
                 symbols_data[symbol] = SymbolData().dict()
         
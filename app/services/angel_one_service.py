@@ -15,6 +15,7 @@ from ..core.symbols import SymbolsConfig
 from ..models.signal import SignalModel
 from ..models.market_data import MarketDataModel
 from ..ws import broadcast_market_data, broadcast_price_update
+from ..utils.timezone_utils import MARKET_OPEN_TIME, MARKET_CLOSE_TIME, TRADING_DAYS_MASK
 
 # Import services lazily to avoid circular imports
 def get_market_data_service():
@@ -32,6 +33,9 @@ logger = logging.getLogger(__name__)
 # IST timezone
 IST = pytz.timezone('Asia/Kolkata')
 
+# WebSocket messages buffered between the socket thread and the async processor
+WS_QUEUE_MAXSIZE = 10000
+
 
 class AngelOneService:
     def __init__(self):
@@ -78,7 +82,10 @@ class AngelOneService:
         self.futures_tokens = SymbolsConfig.get_futures_tokens_dict()
         self.valid_symbols = set(SymbolsConfig.get_symbol_names())
         
-        self.ws_queue = queue.Queue()
+        # Bounded so a stalled consumer can't grow memory without limit - the
+        # WebSocket thread drops ticks rather than block the socket reader
+        self.ws_queue = queue.Queue(maxsize=WS_QUEUE_MAXSIZE)
+        self.ws_queue_dropped = 0
         self.ws_queue_thread = None
         
         # Auto-reconnection and health monitoring
@@ -295,8 +302,13 @@ class AngelOneService:
         def on_data(wsapp, message):
             """Handle incoming market data"""
             try:
-                logger.debug(f"📊 Received market data: {message}")
-                self.ws_queue.put(message)
+                logger.debug("📊 Received market data: %s", message)
+                try:
+                    self.ws_queue.put_nowait(message)
+                except queue.Full:
+                    self.ws_queue_dropped += 1
+                    if self.ws_queue_dropped % 1000 == 1:
+                        logger.warning(f"⚠️ WebSocket queue full - dropped {self.ws_queue_dropped} messages so far")
                 # Update last data received timestamp
                 self.last_data_received = datetime.now(IST)
             except Exception as e:
@@ -438,13 +450,10 @@ class AngelOneService:
     
     def _is_market_hours(self, dt: datetime) -> bool:
         """Check if current time is within market hours (9:15 AM - 3:30 PM IST)"""
-        if dt.weekday() >= 5:  # Weekend
+        if not (TRADING_DAYS_MASK >> dt.weekday()) & 1:  # Weekend
             return False
         
-        market_open = datetime(dt.year, dt.month, dt.day, 9, 15, 0, 0)
-        market_close = datetime(dt.year, dt.month, dt.day, 15, 30, 0, 0)
-        
-        return market_open <= dt <= market_close
+        return MARKET_OPEN_TIME <= dt.time() <= MARKET_CLOSE_TIME
     
     async def _fetch_live_data(self):
         """Fetch live market data using REST API - using central symbols configuration"""
@@ -641,7 +650,7 @@ class AngelOneService:
             symbol = parsed_data.get('symbol', 'unknown')
             await broadcast_price_update(symbol, parsed_data)
             
-            logger.debug(f"✅ Processed tick data for {parsed_data.get('symbol', 'unknown')}")
+            logger.debug("✅ Processed tick data for %s", parsed_data.get('symbol', 'unknown'))
             
         except Exception as e:
             logger.error(f"Error processing WebSocket data: {e}")
@@ -664,7 +673,7 @@ class AngelOneService:
             tick_service = get_tick_data_service()
             asyncio.create_task(tick_service.store_tick_data(parsed_data))
             
-            logger.debug(f"✅ Processed tick data for {parsed_data.get('symbol', 'unknown')}")
+            logger.debug("✅ Processed tick data for %s", parsed_data.get('symbol', 'unknown'))
             
         except Exception as e:
             logger.error(f"Error processing WebSocket data: {e}")
@@ -685,9 +694,9 @@ class AngelOneService:
             )
             
             if result.upserted_id:
-                logger.debug(f"📊 Stored new tick: {tick_data['symbol']} @ {tick_data['price']}")
+                logger.debug("📊 Stored new tick: %s @ %s", tick_data['symbol'], tick_data['price'])
             else:
-                logger.debug(f"📊 Updated existing tick: {tick_data['symbol']} @ {tick_data['price']}")
+                logger.debug("📊 Updated existing tick: %s @ %s", tick_data['symbol'], tick_data['price'])
                 
         except Exception as e:
             logger.error(f"Error storing tick data: {e}")
@@ -713,7 +722,7 @@ class AngelOneService:
                 else:
                     # If no exchange timestamp, use current time but log it
                     timestamp = datetime.now(IST)
-                    logger.debug(f"No exchange timestamp for {symbol}, using current time")
+                    logger.debug("No exchange timestamp for %s, using current time", symbol)
                 
                 tick_data = {
                     'symbol': symbol,
@@ -726,7 +735,7 @@ class AngelOneService:
                     'source': 'angel_one_websocket'
                 }
                 
-                logger.debug(f"✅ Parsed tick data: {symbol} @ ₹{price_rupees:.2f}")
+                logger.debug("✅ Parsed tick data: %s @ ₹%.2f", symbol, price_rupees)
                 return tick_data
             
             # Legacy format handling (if any)
@@ -855,14 +864,16 @@ class AngelOneService:
             if not symbols:
                 symbols = SymbolsConfig.get_symbol_names()
             
-            market_data = []
+            # LTP calls are blocking HTTP round trips - run them in the executor
+            # concurrently, capped so a burst stays inside Angel One's rate limits
+            semaphore = asyncio.Semaphore(4)
             
-            for symbol in symbols:
+            async def fetch_symbol(symbol: str):
                 try:
                     # Get token for symbol
                     token = self._get_token_from_symbol(symbol)
                     if not token:
-                        continue
+                        return None
                     
                     # Get exchange and trading symbol for the symbol
                     exchange = "NSE"  # Default for indices
@@ -874,19 +885,26 @@ class AngelOneService:
                         trading_symbol = self.futures_tokens[symbol]['trading_symbol']
                     
                     # Get LTP data
-                    ltp_data = self.smart_api.ltpData(exchange, trading_symbol, token)
+                    async with semaphore:
+                        ltp_data = await self._fetch_with_retry(
+                            lambda ex=exchange, ts=trading_symbol, t=token: self.smart_api.ltpData(ex, ts, t)
+                        )
                     
                     if ltp_data and ltp_data.get('status'):
-                        data = ltp_data['data']
-                        parsed_data = self._parse_rest_data(data)
-                        if parsed_data:
-                            market_data.append(parsed_data)
-                            # Store in database
-                            await self._store_market_data(parsed_data)
-                        
+                        return self._parse_rest_data(ltp_data['data'])
+                    
                 except Exception as e:
                     logger.error(f"Error getting data for {symbol}: {e}")
-                    continue
+                return None
+            
+            results = await asyncio.gather(*(fetch_symbol(symbol) for symbol in symbols))
+            
+            market_data = []
+            for parsed_data in results:
+                if parsed_data:
+                    market_data.append(parsed_data)
+                    # Store in database
+                    await self._store_market_data(parsed_data)
             
             return market_data
             
@@ -1113,6 +1131,15 @@ class AngelOneService:
                     lambda: self.ws_queue.get(timeout=1.0)
                 )
                 await self._process_websocket_data(message)
+                
+                # Drain the rest of a burst on the loop, without a thread hop per message
+                while True:
+                    try:
+                        message = self.ws_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    await self._process_websocket_data(message)
+                
                 # Update last data received timestamp
                 self.last_data_received = datetime.now(IST)
             except queue.Empty:
@@ -9,6 +9,9 @@ from ..core.database import get_collection
 from ..models.market_data import MarketDataModel, MarketDataBatch, MarketDataFilter, MarketDataResponse
 from ..utils.timezone_utils import TimezoneUtils
 
+# Fields read by chart aggregation - skips raw_data/depth on day-long loads
+_CHART_PROJECTION = {"_id": 0, "received_at": 1, "ltpc": 1, "volume": 1, "symbol": 1, "exchange": 1}
+
 
 class MarketDataService:
     """Service for handling market data operations"""
@@ -144,8 +147,9 @@ class MarketDataService:
                 "ltpc": {"$gte": market_data.ltpc * 0.999, "$lte": market_data.ltpc * 1.001}  # 0.1% tolerance
             }
             
-            count = await self._get_collection().count_documents(query)
-            return count > 0
+            # Existence check only - stop at the first match instead of counting them all
+            match = await self._get_collection().find_one(query, {"_id": 1})
+            return match is not None
             
         except Exception as e:
             self.logger.error(f"Error checking for duplicates: {e}")
@@ -478,7 +482,7 @@ class MarketDataService:
             }
             
             # Get raw data
-            cursor = self._get_collection().find(query).sort("received_at", 1)
+            cursor = self._get_collection().find(query, _CHART_PROJECTION).sort("received_at", 1)
             raw_data = await cursor.to_list(length=None)
             
             if not raw_data:
@@ -593,16 +597,11 @@ class MarketDataService:
             List[str]: List of available symbols
         """
         try:
-            # Get unique symbols from the database
-            pipeline = [
-                {"$group": {"_id": "$symbol"}},
-                {"$sort": {"_id": 1}}
-            ]
+            # Get unique symbols from the database - distinct walks the
+            # (symbol, received_at) index instead of grouping every document
+            documents = await self._get_collection().distinct("symbol")
             
-            cursor = self._get_collection().aggregate(pipeline)
-            documents = await cursor.to_list(length=None)
-            
-            symbols = [doc["_id"] for doc in documents if doc["_id"]]
+            symbols = sorted(symbol for symbol in documents if symbol)
             
             self.logger.info(f"📊 Found {len(symbols)} available symbols")
             return symbols
@@ -619,11 +618,13 @@ class MarketDataService:
             Dict: Health status information
         """
         try:
-            # Check database connection
-            total_count = await self._get_collection().count_documents({})
+            # Check database connection - metadata count, health is polled so no full count scan
+            total_count = await self._get_collection().estimated_document_count()
             
-            # Get latest data timestamp
-            latest_doc = await self._get_collection().find_one({}, sort=[("received_at", -1)])
+            # Get latest data timestamp - newest entry off the received_at index, timestamp only
+            latest_doc = await self._get_collection().find_one(
+                {}, {"_id": 0, "received_at": 1}, sort=[("received_at", -1)]
+            )
             latest_timestamp = latest_doc.get("received_at") if latest_doc else None
             
             # Calculate data freshness using timezone utils
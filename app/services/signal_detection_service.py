@@ -17,6 +17,11 @@ from ..utils.timezone_utils import TimezoneUtils
 
 logger = logging.getLogger(__name__)
 
+# Only the fields a candle or session range needs, read through the (symbol, received_at)
+# index created at startup - hinted, so the planner can't settle on (symbol, timestamp)
+_CANDLE_TICK_PROJECTION = {'_id': 0, 'price': 1, 'received_at': 1, 'volume': 1}
+_CANDLE_TICK_INDEX = [('symbol', 1), ('received_at', 1)]
+
 class TradingSession:
     def __init__(self, name: str, start_time: str, end_time: str):
         self.name = name
@@ -320,7 +325,7 @@ class SignalDetectionService:
                         '$gte': start_time_ist,
                         '$lt': end_time_ist
                     }
-                }).sort('received_at', 1)
+                }, _CANDLE_TICK_PROJECTION).sort('received_at', 1).hint(_CANDLE_TICK_INDEX)
                 
                 # Collect all ticks for this session
                 session_ticks = []
@@ -340,7 +345,7 @@ class SignalDetectionService:
                             '$gte': start_time_ist,
                             '$lt': end_time_ist
                         }
-                    }).sort('received_at', 1)
+                    }, _CANDLE_TICK_PROJECTION).sort('received_at', 1).hint(_CANDLE_TICK_INDEX)
                     
                     async for doc in cursor:
                         session_ticks.append({
@@ -395,8 +400,7 @@ class SignalDetectionService:
         """Process current 5-minute candle data"""
         try:
             # Get 5-minute candle start time
-            candle_minute = (current_time.minute // 5) * 5
-            candle_start = current_time.replace(minute=candle_minute, second=0, microsecond=0)
+            candle_start = TimezoneUtils.floor_to_interval(current_time, 5)
             candle_end = candle_start + timedelta(minutes=5)
             
             # Convert to naive IST for database queries
@@ -432,58 +436,48 @@ class SignalDetectionService:
             start_time_ist = TimezoneUtils.to_ist(start_time) if start_time.tzinfo else start_time
             end_time_ist = TimezoneUtils.to_ist(end_time) if end_time.tzinfo else end_time
             
-            # Query database directly using same approach as chart API
+            # Query database directly using same approach as chart API - symbol and
+            # native datetime bounds on received_at, sorted in (symbol, received_at) index order
             collection = get_collection("tick_data")
-            cursor = collection.find({
-                'symbol': symbol.upper(),
-                'received_at': {
-                    '$gte': start_time_ist,
-                    '$lt': end_time_ist
-                }
-            }).sort('received_at', 1)
             
-            # Fetch tick data
-            tick_data = []
-            async for doc in cursor:
-                tick_data.append({
-                    'price': doc.get('price'),
-                    'timestamp': doc.get('received_at'),
-                    'volume': doc.get('volume', 0) or 0
-                })
+            async def aggregate_candle(query_symbol: str) -> Optional[Dict]:
+                # Reduce to one OHLCV document server-side - the sort follows the
+                # hinted index, so $first/$last are the window's open and close
+                pipeline = [
+                    {'$match': {
+                        'symbol': query_symbol.upper(),
+                        'received_at': {
+                            '$gte': start_time_ist,
+                            '$lt': end_time_ist
+                        }
+                    }},
+                    {'$sort': {'received_at': 1}},
+                    {'$project': _CANDLE_TICK_PROJECTION},
+                    {'$group': {
+                        '_id': None,
+                        'open': {'$first': '$price'},
+                        'high': {'$max': '$price'},
+                        'low': {'$min': '$price'},
+                        'close': {'$last': '$price'},
+                        'volume': {'$sum': '$volume'},
+                        'tick_count': {'$sum': 1}
+                    }},
+                    {'$project': {'_id': 0}}
+                ]
+                docs = await collection.aggregate(pipeline, hint=_CANDLE_TICK_INDEX).to_list(length=1)
+                return docs[0] if docs else None
+            
+            candle = await aggregate_candle(symbol)
             
             # If no ticks found for futures symbols, use NIFTY as proxy
-            if not tick_data and symbol in self.nifty_futures:
+            if candle is None and symbol in self.nifty_futures:
                 logger.debug(f"No data for {symbol}, using NIFTY as proxy")
-                cursor = collection.find({
-                    'symbol': self.nifty_index.upper(),
-                    'received_at': {
-                        '$gte': start_time_ist,
-                        '$lt': end_time_ist
-                    }
-                }).sort('received_at', 1)
-                
-                async for doc in cursor:
-                    tick_data.append({
-                        'price': doc.get('price'),
-                        'timestamp': doc.get('received_at'),
-                        'volume': doc.get('volume', 0) or 0
-                    })
+                candle = await aggregate_candle(self.nifty_index)
             
-            if not tick_data:
+            if candle is None:
                 return None
             
-            prices = [tick['price'] for tick in tick_data]
-            volumes = [tick.get('volume', 0) or 0 for tick in tick_data]
-            
-            candle = {
-                'timestamp': start_time_ist,
-                'open': prices[0],
-                'high': max(prices),
-                'low': min(prices),
-                'close': prices[-1],
-                'volume': sum(volumes),
-                'tick_count': len(tick_data)
-            }
+            candle['timestamp'] = start_time_ist
             
             logger.debug(f"📊 Generated candle for {symbol}: {start_time_ist.strftime('%H:%M')}-{end_time_ist.strftime('%H:%M')} O={candle['open']:.2f} H={candle['high']:.2f} L={candle['low']:.2f} C={candle['close']:.2f} Ticks={candle['tick_count']}")
             
@@ -897,18 +891,23 @@ class SignalDetectionService:
             # PRIORITY 1: Get latest price directly from live tick data (most accurate during market hours)
             start_time = current_time - timedelta(minutes=5)  # Last 5 minutes
             
-            ticks = await tick_data_service.get_ticks_for_timerange(symbol, start_time, current_time)
-            if ticks:
-                latest_price = ticks[-1]['price']
-                logger.debug(f"💰 Got live tick price for {symbol}: ₹{latest_price} (from {len(ticks)} recent ticks)")
+            # Stream the window keeping only the newest tick, instead of holding every tick
+            latest_price = None
+            tick_count = 0
+            async for tick in tick_data_service.get_ticks_stream(symbol, start_time, current_time):
+                latest_price = tick['price']
+                tick_count += 1
+            if tick_count:
+                logger.debug(f"💰 Got live tick price for {symbol}: ₹{latest_price} (from {tick_count} recent ticks)")
                 return latest_price
             
             # For futures symbols, try to get NIFTY live tick data as proxy
             if symbol in self.nifty_futures:
                 logger.debug(f"No live tick data for {symbol}, trying NIFTY live ticks as proxy")
-                nifty_ticks = await tick_data_service.get_ticks_for_timerange(self.nifty_index, start_time, current_time)
-                if nifty_ticks:
-                    nifty_price = nifty_ticks[-1]['price']
+                nifty_price = None
+                async for tick in tick_data_service.get_ticks_stream(self.nifty_index, start_time, current_time):
+                    nifty_price = tick['price']
+                if nifty_price is not None:
                     logger.debug(f"💰 Using NIFTY live tick price as proxy for {symbol}: ₹{nifty_price}")
                     return nifty_price
             
@@ -1128,7 +1127,7 @@ class SignalDetectionService:
             collection = get_collection('signals')
             await collection.update_one(
                 {'id': signal_id},
-                {'$set': {'status': 'REPLACED', 'updated_at': TimezoneUtils.to_ist(TimezoneUtils.get_ist_now())}}
+                {'$set': {'status': 'REPLACED', 'updated_at': TimezoneUtils.get_ist_now()}}
             )
             
             logger.info(f"🔄 Deactivated signal: {signal_id}")
@@ -1254,11 +1253,12 @@ class SignalDetectionService:
         try:
             signals_collection = get_collection('signals')
             
-            # Prepare document for insertion
+            # Prepare document for insertion - one clock read, so created_at == updated_at
+            now_ist = TimezoneUtils.get_ist_now()
             signal_doc = {
                 **signal_data,
-                'created_at': TimezoneUtils.to_ist(TimezoneUtils.get_ist_now()),
-                'updated_at': TimezoneUtils.to_ist(TimezoneUtils.get_ist_now())
+                'created_at': now_ist,
+                'updated_at': now_ist
             }
             
             # Try to insert the signal
@@ -1324,7 +1324,7 @@ class SignalDetectionService:
                     {
                         '$set': {
                             'status': 'EXPIRED',
-                            'updated_at': TimezoneUtils.to_ist(TimezoneUtils.get_ist_now())
+                            'updated_at': TimezoneUtils.get_ist_now()
                         }
                     }
                 )
@@ -8,15 +8,20 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+from pymongo.errors import DuplicateKeyError
+
 from ..core.database import get_collection
 from ..core.symbols import SymbolsConfig
 from ..models.signal import SignalModel, SignalType, SignalStrength
 from ..models.session_state import session_state_service, SessionStatus
 from .tick_data_service import tick_data_service
-from ..utils.timezone_utils import TimezoneUtils
+from ..utils.timezone_utils import TimezoneUtils, MARKET_OPEN_MIN, MARKET_CLOSE_MIN, TRADING_DAYS_MASK
 
 logger = logging.getLogger(__name__)
 
+# Datetime fields on signal documents that API responses render as ISO strings
+SIGNAL_DATETIME_FIELDS = ('timestamp', 'created_at', 'updated_at')
+
 
 class SignalDetectionServiceV2:
     """Database-backed signal detection service - no race conditions"""
@@ -34,19 +39,43 @@ class SignalDetectionServiceV2:
         
         # Service dependencies
         self.session_service = session_state_service
+        self.signals_collection = None
+        
+        # In-memory session state machine for the current trading date -
+        # session_name -> session document. The database is only written to
+        # as a durability log through the persistence queue.
+        self._sessions: Dict[str, Dict] = {}
+        self._sessions_date: Optional[str] = None
+        
+        # YYYY-MM-DD string for the current day, recomputed only on date change
+        self._cached_day = None
+        self._cached_date: Optional[str] = None
+        self._persist_queue: asyncio.Queue = asyncio.Queue()
+        self._persist_task = None
+        
+        # Cap concurrent per-session work so fan-out stays within the Mongo pool
+        self._session_semaphore = asyncio.Semaphore(16)
+    
+    def _get_signals_collection(self):
+        """Lazy initialization of signals collection"""
+        if self.signals_collection is None:
+            self.signals_collection = get_collection('signals')
+        return self.signals_collection
     
     async def start_monitoring(self):
         """Start database-backed real-time monitoring"""
-        print("🚀 SIGNAL DETECTION V2: Starting database-backed signal detection service...")
         logger.info("🚀 Starting database-backed signal detection service...")
         
         self.monitoring_active = True
         
-        # Initialize today's sessions in database
+        # Initialize today's sessions in database and load them into memory
         today = TimezoneUtils.get_ist_now().strftime('%Y-%m-%d')
-        await self.session_service.initialize_daily_sessions(today)
+        await self._load_sessions(today)
         logger.info(f"📅 Initialized sessions in database for {today}")
         
+        # Start the background writer for session state transitions
+        self._persist_task = asyncio.create_task(self._persistence_loop())
+        
         # Start single monitoring loop
         logger.info("🔄 Creating single monitoring loop task...")
         self.monitoring_task = asyncio.create_task(self._monitoring_loop())
@@ -54,19 +83,13 @@ class SignalDetectionServiceV2:
         def task_callback(task):
             try:
                 result = task.result()
-                print(f"🔄 SIGNAL DETECTION V2: Monitoring loop ended: {result}")
                 logger.info(f"Monitoring loop ended: {result}")
             except Exception as e:
-                print(f"❌ SIGNAL DETECTION V2: Monitoring loop failed: {e}")
                 logger.error(f"Monitoring loop failed: {e}")
         
         self.monitoring_task.add_done_callback(task_callback)
         
-        # Wait a moment to ensure task starts
-        await asyncio.sleep(0.1)
-        
         logger.info("✅ Database-backed signal detection service started")
-        print("✅ SIGNAL DETECTION V2: Database-backed signal detection service started")
     
     async def stop_monitoring(self):
         """Stop monitoring"""
@@ -74,41 +97,84 @@ class SignalDetectionServiceV2:
         if self.monitoring_task:
             self.monitoring_task.cancel()
             self.monitoring_task = None
+        
+        if self._persist_task:
+            # Give queued state transitions a chance to reach the database
+            try:
+                await asyncio.wait_for(self._persist_queue.join(), timeout=5)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ Timed out flushing pending session state writes")
+            self._persist_task.cancel()
+            self._persist_task = None
         logger.info("🛑 Database-backed signal detection service stopped")
     
+    async def _load_sessions(self, trading_date: str) -> None:
+        """Initialize the day's sessions in the database and load the ones still needing work"""
+        await self.session_service.initialize_daily_sessions(trading_date)
+        
+        sessions_to_process, sessions_for_breakouts = await self.session_service.get_loop_work(trading_date)
+        self._sessions = {
+            session_doc["session_name"]: session_doc
+            for session_doc in sessions_to_process + sessions_for_breakouts
+        }
+        self._sessions_date = trading_date
+    
+    def _persist(self, method, *args) -> None:
+        """Queue a session state write for the background persistence task"""
+        self._persist_queue.put_nowait((method, args))
+    
+    async def _persistence_loop(self):
+        """Apply queued session state writes to the database in order"""
+        while True:
+            method, args = await self._persist_queue.get()
+            try:
+                await method(*args)
+            except Exception as e:
+                logger.error(f"Error persisting session state via {method.__name__}: {e}")
+            finally:
+                self._persist_queue.task_done()
+    
     async def _monitoring_loop(self):
-        """Single stateless monitoring loop - all state in database"""
-        print("🔄 SIGNAL DETECTION V2: Starting database-backed monitoring loop")
+        """Single monitoring loop over the in-memory session state machine"""
         logger.info("🔄 Starting database-backed monitoring loop")
         
         while self.monitoring_active:
             try:
                 current_time = TimezoneUtils.get_ist_now()
-                current_date = current_time.strftime('%Y-%m-%d')
+                current_minutes = current_time.hour * 60 + current_time.minute
                 
-                logger.debug(f"⏰ Monitoring loop tick at {current_time.strftime('%H:%M:%S')}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"⏰ Monitoring loop tick at {current_time.strftime('%H:%M:%S')}")
                 
-                # Only monitor during market hours
-                if not TimezoneUtils.is_market_hours(current_time):
+                # Only monitor during market hours (weekdays, integer minute range)
+                if not (TRADING_DAYS_MASK >> current_time.weekday()) & 1 or not (MARKET_OPEN_MIN <= current_minutes <= MARKET_CLOSE_MIN):
                     logger.debug(f"📴 Outside market hours, sleeping...")
                     await asyncio.sleep(60)
                     continue
                 
+                current_day = current_time.date()
+                if current_day != self._cached_day:
+                    self._cached_day = current_day
+                    self._cached_date = current_time.strftime('%Y-%m-%d')
+                current_date = self._cached_date
+                
                 logger.debug(f"🏪 Market hours active, processing sessions...")
                 
-                # Process pending and active sessions
-                sessions_to_process = await self.session_service.get_sessions_by_status(
-                    current_date, ["PENDING", "ACTIVE"]
-                )
+                # Reload session state when the trading date rolls over
+                if current_date != self._sessions_date:
+                    await self._load_sessions(current_date)
                 
-                for session_doc in sessions_to_process:
-                    await self._process_session_realtime(session_doc, current_time)
+                # Process pending and active sessions
+                await self._run_bounded(self._process_session_realtime, [
+                    session_doc for session_doc in self._sessions.values()
+                    if session_doc["status"] in ("PENDING", "ACTIVE")
+                ], current_time)
                 
                 # Check completed sessions for breakouts
-                sessions_for_breakouts = await self.session_service.get_sessions_for_breakout_check(current_date)
-                
-                for session_doc in sessions_for_breakouts:
-                    await self._check_session_breakouts(session_doc, current_time)
+                await self._run_bounded(self._check_session_breakouts, [
+                    session_doc for session_doc in self._sessions.values()
+                    if session_doc["status"] == "COMPLETED" and not session_doc.get("breakouts_checked")
+                ], current_time)
                 
                 await asyncio.sleep(10)  # Check every 10 seconds
                 
@@ -118,26 +184,36 @@ class SignalDetectionServiceV2:
                 logger.error(f"Full traceback: {traceback.format_exc()}")
                 await asyncio.sleep(30)
     
+    async def _run_bounded(self, handler, session_docs: List[Dict], current_time: datetime):
+        """Run handler over sessions concurrently, bounded by the session semaphore"""
+        async def guarded(session_doc: Dict):
+            async with self._session_semaphore:
+                await handler(session_doc, current_time)
+        
+        await asyncio.gather(*(guarded(session_doc) for session_doc in session_docs))
+    
     async def _process_session_realtime(self, session_doc: Dict, current_time: datetime):
         """Process single session using database state - atomic operations"""
         try:
             session_name = session_doc["session_name"]
-            start_time_str = session_doc["start_time"]
-            end_time_str = session_doc["end_time"]
             current_status = session_doc["status"]
             
-            # Convert times to minutes for comparison
-            start_minutes = self._time_to_minutes(start_time_str)
-            end_minutes = self._time_to_minutes(end_time_str)
+            # Session bounds are stored as minutes since midnight
+            start_minutes = session_doc["start_minutes"]
+            end_minutes = session_doc["end_minutes"]
             current_minutes = current_time.hour * 60 + current_time.minute
             
-            logger.debug(f"📅 Processing session {session_name}: Status={current_status}, Time={current_time.strftime('%H:%M')}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"📅 Processing session {session_name}: Status={current_status}, Time={current_time.strftime('%H:%M')}")
             
             # State transition: PENDING -> ACTIVE
             if current_status == "PENDING" and current_minutes >= start_minutes:
                 logger.info(f"📅 Session '{session_name}' starting at {current_time.strftime('%H:%M')}")
                 
-                await self.session_service.update_session_status(
+                session_doc["status"] = "ACTIVE"
+                session_doc["started_at"] = current_time
+                self._persist(
+                    self.session_service.update_session_status,
                     str(session_doc["_id"]), 
                     "ACTIVE",
                     {"started_at": current_time}
@@ -150,7 +226,11 @@ class SignalDetectionServiceV2:
                 # Calculate final session data
                 symbols_data = await self.session_service.calculate_session_data(session_doc, current_time)
                 
-                await self.session_service.update_session_status(
+                session_doc["status"] = "COMPLETED"
+                session_doc["completed_at"] = current_time
+                session_doc["symbols_data"] = symbols_data
+                self._persist(
+                    self.session_service.update_session_status,
                     str(session_doc["_id"]),
                     "COMPLETED", 
                     {
@@ -182,18 +262,20 @@ class SignalDetectionServiceV2:
             
             if not session_high or not session_low:
                 logger.debug(f"❌ No session data for {session_name} - skipping breakout check")
-                await self.session_service.mark_breakouts_checked(str(session_doc["_id"]))
+                session_doc["breakouts_checked"] = True
+                self._persist(self.session_service.mark_breakouts_checked, str(session_doc["_id"]))
                 return
             
             # Get current prices
-            nifty_price = await self._get_current_price(self.nifty_index)
-            futures_price = await self._get_current_price(self.nifty_futures[0])
+            nifty_price = await self._get_current_price(self.nifty_index, current_time)
+            futures_price = await self._get_current_price(self.nifty_futures[0], current_time)
             
             if not nifty_price or not futures_price:
                 logger.debug(f"❌ No current prices available - skipping breakout check")
                 return
             
-            logger.info(f"🎯 Breakout check: {session_name} | NIFTY @ ₹{nifty_price:.2f} vs High ₹{session_high:.2f} vs Low ₹{session_low:.2f}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"🎯 Breakout check: {session_name} | NIFTY @ ₹{nifty_price:.2f} vs High ₹{session_high:.2f} vs Low ₹{session_low:.2f}")
             
             # Check breakout conditions
             signals_generated = []
@@ -226,7 +308,11 @@ class SignalDetectionServiceV2:
                 logger.debug(f"📊 No breakout: {session_name} | ₹{nifty_price:.2f} within range ₹{session_low:.2f} - ₹{session_high:.2f}")
             
             # Mark as checked (even if no breakouts)
-            await self.session_service.mark_breakouts_checked(
+            session_doc["breakouts_checked"] = True
+            if signals_generated:
+                session_doc["signals_generated"] = signals_generated
+            self._persist(
+                self.session_service.mark_breakouts_checked,
                 str(session_doc["_id"]), 
                 signals_generated
             )
@@ -243,24 +329,10 @@ class SignalDetectionServiceV2:
             symbols_data = session_doc["symbols_data"]
             
             # Determine signal type based on breakout
-            if breakout_type == "HIGH_BREAK":
-                signal_type = "BUY_CALL"
-                reason = f"High breakout: ₹{nifty_price:.2f} broke {session_name} high by +{breakout_amount}"
-            else:  # LOW_BREAK
-                signal_type = "BUY_PUT" 
-                reason = f"Low breakout: ₹{nifty_price:.2f} broke {session_name} low by -{breakout_amount}"
-            
-            # Check for duplicate signals
-            signals_collection = get_collection('signals')
-            existing_signal = await signals_collection.find_one({
-                'session_name': session_name,
-                'signal_type': signal_type,
-                'status': 'ACTIVE'
-            })
+            signal_type = "BUY_CALL" if breakout_type == "HIGH_BREAK" else "BUY_PUT"
             
-            if existing_signal:
-                logger.info(f"⏭️ Signal {signal_type} already exists for session {session_name}")
-                return None
+            # Single IST timestamp for all signal time fields
+            now_ist = TimezoneUtils.to_ist(timestamp)
             
             # Create signal ID
             signal_id = f"{session_name}_{signal_type}_{timestamp.strftime('%H%M%S')}_{timestamp.microsecond}"
@@ -275,13 +347,13 @@ class SignalDetectionServiceV2:
                 signal_type, session_high, session_low, nifty_price
             )
             
-            # Create comprehensive signal data
+            # Create comprehensive signal data - numeric fields only, the
+            # consumer renders breakout_type/breakout_amount for display
             signal_data = {
                 'id': signal_id,
                 'session_name': session_name,
                 'signal_type': signal_type,
-                'reason': reason,
-                'timestamp': TimezoneUtils.to_ist(timestamp),
+                'timestamp': now_ist,
                 'nifty_price': nifty_price,
                 'future_price': futures_price,
                 'future_symbol': self.nifty_futures[0],
@@ -295,18 +367,22 @@ class SignalDetectionServiceV2:
                 'session_low': session_low,
                 'breakout_amount': breakout_amount,
                 'breakout_type': breakout_type,
-                'display_text': f"🔥 {reason}",
-                'created_at': TimezoneUtils.to_ist(TimezoneUtils.get_ist_now()),
-                'updated_at': TimezoneUtils.to_ist(TimezoneUtils.get_ist_now())
+                'created_at': now_ist,
+                'updated_at': now_ist
             }
             
-            # Save to database
-            await self._save_signal_to_db(signal_data)
+            # Save first - the partial unique index on ACTIVE signals rejects
+            # duplicates, so no separate existence check is needed. Only a stored
+            # signal is broadcast; any other save error propagates to the handler below
+            try:
+                await self._save_signal_to_db(signal_data)
+            except DuplicateKeyError:
+                logger.info(f"⏭️ Signal {signal_type} already exists for session {session_name}")
+                return None
             
-            # Broadcast via WebSocket
             await self._broadcast_signal(signal_data)
             
-            logger.info(f"🚨 BREAKOUT SIGNAL GENERATED: {signal_type} | {reason}")
+            logger.info(f"🚨 BREAKOUT SIGNAL GENERATED: {signal_type} | {breakout_type} {session_name} by {breakout_amount}")
             logger.info(f"   Entry: ₹{nifty_price:.2f} | Stop: ₹{stop_loss:.2f} | Target1: ₹{target_1:.2f} | Target2: ₹{target_2:.2f}")
             
             return signal_id
@@ -315,11 +391,6 @@ class SignalDetectionServiceV2:
             logger.error(f"Error generating breakout signal: {e}")
             return None
     
-    def _time_to_minutes(self, time_str: str) -> int:
-        """Convert HH:MM to total minutes"""
-        hour, minute = map(int, time_str.split(':'))
-        return hour * 60 + minute
-    
     def _calculate_stop_loss_and_targets(self, signal_type: str, session_high: float, 
                                        session_low: float, entry_price: float) -> tuple:
         """Calculate stop loss and targets based on session range"""
@@ -346,21 +417,16 @@ class SignalDetectionServiceV2:
             logger.error(f"Error calculating stop loss and targets: {e}")
             return None, None, None
     
-    async def _get_current_price(self, symbol: str) -> Optional[float]:
+    async def _get_current_price(self, symbol: str, current_time: datetime) -> Optional[float]:
         """Get current price for symbol"""
         try:
-            current_time = TimezoneUtils.get_ist_now()
-            start_time = current_time - timedelta(minutes=2)
-            
-            ticks = await tick_data_service.get_ticks_for_timerange(symbol, start_time, current_time)
-            if ticks:
-                return ticks[-1]['price']
+            price = await self._get_latest_price(symbol, current_time)
+            if price is not None:
+                return price
             
             # Fallback for futures - use NIFTY as proxy
             if symbol in self.nifty_futures:
-                nifty_ticks = await tick_data_service.get_ticks_for_timerange(self.nifty_index, start_time, current_time)
-                if nifty_ticks:
-                    return nifty_ticks[-1]['price']
+                return await self._get_latest_price(self.nifty_index, current_time)
             
             return None
             
@@ -368,14 +434,31 @@ class SignalDetectionServiceV2:
             logger.error(f"Error getting current price for {symbol}: {e}")
             return None
     
+    async def _get_latest_price(self, symbol: str, current_time: datetime) -> Optional[float]:
+        """Latest price from the in-process tick cache, falling back to the newest stored tick"""
+        price = tick_data_service.get_latest_price(symbol)
+        if price is not None:
+            return price
+        
+        latest_ticks = await tick_data_service.get_latest_ticks(symbol, limit=1)
+        if latest_ticks:
+            received_at = latest_ticks[0].get('received_at')
+            if received_at and received_at >= current_time - timedelta(minutes=2):
+                return latest_ticks[0]['price']
+        
+        return None
+    
     async def _save_signal_to_db(self, signal_data: Dict):
-        """Save signal to database"""
+        """Save signal to database - raises on failure, DuplicateKeyError for an existing ACTIVE signal"""
         try:
-            signals_collection = get_collection('signals')
+            signals_collection = self._get_signals_collection()
             await signals_collection.insert_one(signal_data)
             logger.debug(f"✅ Signal saved to database: {signal_data.get('id')}")
+        except DuplicateKeyError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error saving signal to database: {e}")
+            raise
     
     async def _broadcast_signal(self, signal_data: Dict):
         """Broadcast signal via WebSocket"""
@@ -389,27 +472,35 @@ class SignalDetectionServiceV2:
     async def get_active_signals(self) -> List[Dict]:
         """Get active signals from database"""
         try:
-            signals_collection = get_collection('signals')
-            cursor = signals_collection.find({'status': 'ACTIVE'}).sort('created_at', -1)
-            
-            signals = []
-            async for signal_doc in cursor:
-                # Convert ObjectId to string for JSON serialization
-                clean_signal = {}
-                for key, value in signal_doc.items():
-                    if key == '_id':
-                        clean_signal['_id'] = str(value)
-                    elif hasattr(value, 'isoformat'):  # datetime objects
-                        clean_signal[key] = value.isoformat()
-                    else:
-                        clean_signal[key] = value
-                signals.append(clean_signal)
-            
-            return signals
+            signals_collection = self._get_signals_collection()
+            
+            # Stringify ObjectId and datetimes server-side so the documents
+            # come back ready for JSON serialization
+            pipeline = [
+                {'$match': {'status': 'ACTIVE'}},
+                {'$sort': {'created_at': -1}},
+                {'$addFields': {
+                    '_id': {'$toString': '$_id'},
+                    **{field: self._iso_string_expr(field) for field in SIGNAL_DATETIME_FIELDS}
+                }}
+            ]
+            
+            return await signals_collection.aggregate(pipeline).to_list(length=None)
         except Exception as e:
             logger.error(f"Error getting active signals: {e}")
             return []
     
+    @staticmethod
+    def _iso_string_expr(field: str) -> Dict:
+        """Aggregation expression rendering a date field as a naive ISO string"""
+        return {
+            '$cond': [
+                {'$eq': [{'$type': f'${field}'}, 'date']},
+                {'$dateToString': {'date': f'${field}', 'format': '%Y-%m-%dT%H:%M:%S.%L'}},
+                f'${field}'
+            ]
+        }
+    
     async def get_session_status(self) -> List[Dict]:
         """Get current session status from database"""
         try:
@@ -1,35 +1,195 @@
 """
 Production-Grade Tick Data Service
 Handles real-time market data ingestion, storage, and broadcasting
+
+The ingest path never spawns a task per tick - buffering, flushing and
+broadcasting are each driven by long-lived background tasks. Deploy under
+uvicorn[standard], which installs uvloop and uses it automatically.
 """
 
 import asyncio
 import logging
+import time
+from array import array
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from pymongo import ReadPreference, UpdateOne
+from pymongo.read_concern import ReadConcern
+from pymongo.errors import BulkWriteError
+from ..core.config import settings
 from ..core.database import get_collection
 from ..ws import broadcast_market_data, broadcast_price_update
 from ..utils.timezone_utils import TimezoneUtils
 
 logger = logging.getLogger(__name__)
 
+# Optional numeric tick fields and their types - absent or zero values are left out of the document
+_NUMERIC_SCHEMA = (
+    ('high', float),
+    ('low', float),
+    ('volume', int),
+    ('change', float),
+    ('change_percent', float),
+)
+
+# Fields returned by time-range tick queries - keeps bulky fields off the wire
+_TIMERANGE_PROJECTION = {
+    '_id': 0,
+    'symbol': 1,
+    'price': 1,
+    'timestamp': 1,
+    'timestamp_ms': 1,
+    'received_at': 1,
+    'volume': 1,
+    'change': 1,
+    'change_percent': 1,
+    'exchange': 1,
+    'source': 1,
+}
+
+# MongoDB duplicate key error code
+DUPLICATE_KEY_ERROR = 11000
+
+# Fields needed to build typed price/time columns for a time range
+_COLUMNS_PROJECTION = {'_id': 0, 'price': 1, 'timestamp': 1, 'timestamp_ms': 1}
+
+# Documents per getMore when streaming a time range - fewer round trips, bounded memory
+STREAM_BATCH_SIZE = 5000
+
+# Server-side time limit for statistics queries, in milliseconds
+STATS_MAX_TIME_MS = 5000
+
+# Number of independent tick buffers/flush tasks (power of two, for mask routing)
+TICK_SHARDS = 4
+
+
+try:
+    # orjson is considerably faster, and formats datetimes natively
+    import orjson
+    
+    def dump_tick(tick_doc: Dict[str, Any]) -> str:
+        """Indented JSON text of a tick document, for logs and diagnostics
+        
+        Stored datetimes are naive IST, so they are written without an offset.
+        """
+        return orjson.dumps(tick_doc, default=str, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    import json
+    
+    def dump_tick(tick_doc: Dict[str, Any]) -> str:
+        """Indented JSON text of a tick document, for logs and diagnostics
+        
+        Stored datetimes are naive IST, so they are written without an offset.
+        """
+        return json.dumps(tick_doc, indent=2, ensure_ascii=False,
+                          default=lambda value: value.isoformat() if hasattr(value, 'isoformat') else str(value))
+
+
+def _mk_broadcast(tick_doc: Dict[str, Any], symbol: str, price: float) -> Dict[str, Any]:
+    """Broadcast payload for a tick document, with the field names WebSocket clients expect
+    
+    Optional numeric fields may be missing, or None in older documents, so
+    fall back with `or` rather than a .get() default.
+    """
+    bg = tick_doc.get
+    return {
+        'symbol': symbol,
+        'ltpc': price,  # Last traded price
+        'ch': bg('change') or 0,  # Change
+        'chp': bg('change_percent') or 0,  # Change percent
+        'high': bg('high') or price,
+        'low': bg('low') or price,
+        'open': bg('open') or price,
+        'close': price,  # Current price is the close
+        'volume': bg('volume') or 0,
+        'exchange': bg('exchange', 'NSE'),
+        'received_at': tick_doc['timestamp']
+    }
+
+
+class _TickShard:
+    """Swap buffer of pending ticks with its own background flush task
+    
+    Ingest appends to buf synchronously; the flush task swaps buf for an empty
+    list and writes the old one. Both happen between awaits, so on the event
+    loop they never interleave and need no lock.
+    
+    Ticks are numbered in append order; batches are written in that order, so
+    a caller waiting on its own ticks only waits until `written` reaches the
+    sequence number of its last append - not for the shard to go idle.
+    """
+    
+    def __init__(self):
+        self.buf: List[Dict[str, Any]] = []
+        self.appended = 0  # Sequence number of the last tick appended
+        self.written = 0  # Every tick up to this sequence number has been written
+        self.waiters: List[Tuple[int, asyncio.Future]] = []  # (sequence number, future) awaiting a write
+        self.wake = asyncio.Event()  # Set when buf fills up or a caller wants it flushed now
+        self.flush_task = None
+    
+    def wait_written(self, seq: int) -> asyncio.Future:
+        """Future resolved once every tick up to sequence number seq has been written"""
+        future = asyncio.get_running_loop().create_future()
+        if self.written >= seq:
+            future.set_result(None)
+        else:
+            self.waiters.append((seq, future))
+        return future
+    
+    def mark_written(self, count: int) -> None:
+        """Record a written batch and resolve the waiters it covers"""
+        self.written += count
+        still_waiting = []
+        for seq, future in self.waiters:
+            if seq <= self.written:
+                if not future.done():
+                    future.set_result(None)
+            else:
+                still_waiting.append((seq, future))
+        self.waiters = still_waiting
+
 
 class TickDataService:
     """Production-grade service for real-time tick data management"""
     
     def __init__(self):
         self.collection = None
+        self.read_collection = None
+        self.counts_collection = None
         self.logger = logging.getLogger(__name__)
-        self.tick_buffer = {}  # Buffer for batch inserts
-        self.buffer_size = 10  # Insert after 10 ticks
-        self.buffer_timeout = 1.0  # Insert after 1 second
-        self.last_flush = TimezoneUtils.get_ist_now()
+        self.buffer_size = 1000  # Insert after 1000 ticks
+        self.buffer_timeout = 1.5  # Insert after 1.5 seconds
+        
+        # Ticks waiting to be written, sharded by symbol - each shard is
+        # drained in batches by its own background flush task, so DB writes
+        # stay off the ingest path and a slow flush only holds up one shard
+        self.shards = [_TickShard() for _ in range(TICK_SHARDS)]
+        self._total_buffered = 0  # Ticks queued or mid-flush, across all shards
         
         # Tick deduplication - improved for indices
-        self.last_tick_cache = {}  # symbol -> {price, timestamp}
+        self.last_tick_cache = OrderedDict()  # symbol -> (price, monotonic time), LRU-bounded
+        self.max_tick_cache_size = 2048
         self.min_price_change = 0.5  # Minimum price change to store (50 paise for indices)
         self.min_time_interval = 0.5  # Minimum 500ms between ticks for indices
         
+        # Market-hours flag read on the ingest path, refreshed by a background task
+        self.market_open = TimezoneUtils.is_market_hours()
+        self.market_hours_interval = 30  # Seconds between market-hours checks
+        self.market_hours_task = None
+        
+        # Broadcast payloads waiting for the relay task - bounded, dropping the
+        # oldest when full, so slow WebSocket clients never hold up ingest
+        self.broadcast_queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+        self.broadcast_batch = 50  # Payloads sent per relay cycle before yielding
+        self.relay_task = None
+        
+        # Latest ingested price per symbol - symbol -> (monotonic arrival time, price)
+        self.latest_prices = {}
+        
+        # Raw symbol -> upper-cased symbol, for the bounded feed symbol universe
+        self._symbol_intern: Dict[str, str] = {}
+        
     def _get_collection(self):
         """Get the tick data collection"""
         if self.collection is None:
@@ -42,43 +202,82 @@ class TickDataService:
                 raise RuntimeError("Database connection not established. Please ensure the application is properly started.") from e
         return self.collection
     
+    def _get_read_collection(self):
+        """tick_data handle for reads that tolerate replica lag (charts, diagnostics) -
+        prefers secondaries with local read concern, keeping that load off the primary"""
+        if self.read_collection is None:
+            self.read_collection = self._get_collection().with_options(
+                read_preference=ReadPreference.SECONDARY_PREFERRED,
+                read_concern=ReadConcern("local")
+            )
+        return self.read_collection
+    
+    def _get_counts_collection(self):
+        """Get the per-symbol tick counts collection, kept alongside tick_data"""
+        if self.counts_collection is None:
+            self._get_collection()
+            self.counts_collection = get_collection("tick_counts")
+        return self.counts_collection
+    
+    def _sym(self, raw_symbol: str) -> str:
+        """Upper-cased symbol, cached so .upper() runs once per distinct feed symbol"""
+        symbol = self._symbol_intern.get(raw_symbol)
+        if symbol is None:
+            symbol = self._symbol_intern[raw_symbol] = raw_symbol.upper()
+        return symbol
+    
     def _is_market_hours(self, dt: Optional[datetime] = None) -> bool:
         """Check if current time is within market hours using timezone utils"""
         return TimezoneUtils.is_market_hours(dt)
     
-    def _should_store_tick(self, symbol: str, price: float, timestamp: datetime) -> bool:
-        """Determine if tick should be stored based on deduplication rules"""
-        cache_key = symbol
+    def _market_is_open(self) -> bool:
+        """Cached market-hours flag, starting its refresh task on first use"""
+        if self.market_hours_task is None or self.market_hours_task.done():
+            self.market_open = self._is_market_hours()
+            self.market_hours_task = asyncio.create_task(self._market_hours_watcher())
+        return self.market_open
+    
+    async def _market_hours_watcher(self) -> None:
+        """Refresh the cached market-hours flag periodically"""
+        while True:
+            await asyncio.sleep(self.market_hours_interval)
+            self.market_open = self._is_market_hours()
+    
+    def _should_store_tick(self, symbol: str, price: float, now_mono: float) -> bool:
+        """Determine if tick should be stored based on deduplication rules
+        
+        Arrival times are tracked on the monotonic clock, so the interval
+        check is a float subtraction and ignores wall-clock adjustments.
+        """
+        last_tick = self.last_tick_cache.get(symbol)
         
-        if cache_key in self.last_tick_cache:
-            last_data = self.last_tick_cache[cache_key]
-            last_price = last_data['price']
-            last_time = last_data['timestamp']
+        if last_tick is not None:
+            last_price, last_time = last_tick
             
             # Check minimum price change
             price_change = abs(price - last_price)
             if price_change < self.min_price_change:
-                self.logger.debug(f"Skipping {symbol}: price change {price_change:.2f} < {self.min_price_change}")
+                self.logger.debug("Skipping %s: price change %.2f < %s", symbol, price_change, self.min_price_change)
                 return False
             
             # Check minimum time interval (prevent spam)
-            time_diff = (timestamp - last_time).total_seconds()
+            time_diff = now_mono - last_time
             if time_diff < self.min_time_interval:
-                self.logger.debug(f"Skipping {symbol}: time diff {time_diff:.2f}s < {self.min_time_interval}s")
+                self.logger.debug("Skipping %s: time diff %.2fs < %ss", symbol, time_diff, self.min_time_interval)
                 return False
             
             # Check if price is exactly the same (likely duplicate)
             if price == last_price:
-                self.logger.debug(f"Skipping {symbol}: exact same price {price}")
+                self.logger.debug("Skipping %s: exact same price %s", symbol, price)
                 return False
         
-        # Update cache
-        self.last_tick_cache[cache_key] = {
-            'price': price,
-            'timestamp': timestamp
-        }
+        # Update cache, evicting the least recently stored symbol when full
+        self.last_tick_cache[symbol] = (price, now_mono)
+        self.last_tick_cache.move_to_end(symbol)
+        if len(self.last_tick_cache) > self.max_tick_cache_size:
+            self.last_tick_cache.popitem(last=False)
         
-        self.logger.debug(f"✅ Storing tick: {symbol} @ ₹{price:.2f}")
+        self.logger.debug("✅ Storing tick: %s @ ₹%.2f", symbol, price)
         return True
     
     async def store_tick(self, tick_data: Dict[str, Any]) -> bool:
@@ -92,59 +291,13 @@ class TickDataService:
             bool: True if stored successfully
         """
         try:
-            # Validate required fields
-            if not self._validate_tick_data(tick_data):
-                return False
-            
-            # Check market hours using timezone utils
-            now = TimezoneUtils.get_ist_now()
-            if not self._is_market_hours(now):
-                self.logger.debug(f"Skipping after-hours tick for {tick_data.get('symbol', 'Unknown')}")
-                return False
-            
-            # Parse tick data
-            symbol = tick_data.get('symbol', '').upper()
-            price = float(tick_data.get('ltpc', 0))
-            
-            if not symbol or price <= 0:
-                self.logger.warning(f"Invalid tick data: {tick_data}")
-                return False
-            
-            # Check if we should store this tick (deduplication)
-            if not self._should_store_tick(symbol, price, now):
+            # Parse and validate tick data in one pass
+            parsed = self._parse_raw_tick(tick_data)
+            if parsed is None:
                 return False
             
-            # Prepare tick document with production timezone handling
-            tick_doc = {
-                'symbol': symbol,
-                'price': price,
-                'timestamp': now,  # Store as naive IST
-                'token': tick_data.get('token', ''),
-                'exchange': tick_data.get('exchange', 'NSE'),
-                'high': float(tick_data.get('high', 0)) if tick_data.get('high') else None,
-                'low': float(tick_data.get('low', 0)) if tick_data.get('low') else None,
-                'volume': int(tick_data.get('volume', 0)) if tick_data.get('volume') else None,
-                'change': float(tick_data.get('change', 0)) if tick_data.get('change') else None,
-                'change_percent': float(tick_data.get('change_percent', 0)) if tick_data.get('change_percent') else None,
-                'source': tick_data.get('source', 'angel_one_websocket'),
-                'market_status': 'open',
-                'received_at': TimezoneUtils.get_ist_now()  # When our system received it (naive IST)
-            }
-            
-            # Add to buffer for batch insert
-            if symbol not in self.tick_buffer:
-                self.tick_buffer[symbol] = []
-            
-            self.tick_buffer[symbol].append(tick_doc)
-            
-            # Check if we should flush buffer
-            await self._maybe_flush_buffer()
-            
-            # Broadcast to WebSocket clients immediately
-            await self._broadcast_tick(tick_doc)
-            
-            self.logger.debug(f"📊 Buffered tick: {symbol} @ ₹{price}")
-            return True
+            symbol, price = parsed
+            return await self._ingest(symbol, price, None, tick_data)
             
         except Exception as e:
             self.logger.error(f"Error storing tick: {e}", exc_info=True)
@@ -162,177 +315,282 @@ class TickDataService:
         """
         try:
             # Convert the parsed data format to our internal format
-            symbol = tick_data.get('symbol', '').upper()
-            price = float(tick_data.get('price', 0))
-            timestamp = tick_data.get('timestamp', TimezoneUtils.get_ist_now())
+            g = tick_data.get
+            symbol = self._sym(g('symbol', ''))
+            price = float(g('price', 0))
             
             if not symbol or price <= 0:
                 self.logger.warning(f"Invalid tick data: {tick_data}")
                 return False
             
-            # Check if we should store this tick (deduplication)
-            if not self._should_store_tick(symbol, price, timestamp):
-                return False
-            
-            # Prepare tick document with production timezone handling
-            tick_doc = {
-                'symbol': symbol,
-                'price': price,
-                'timestamp': timestamp,  # Store as naive IST
-                'token': tick_data.get('token', ''),
-                'exchange': tick_data.get('exchange', 'NSE'),
-                'high': float(tick_data.get('high', 0)) if tick_data.get('high') else None,
-                'low': float(tick_data.get('low', 0)) if tick_data.get('low') else None,
-                'volume': int(tick_data.get('volume', 0)) if tick_data.get('volume') else None,
-                'change': float(tick_data.get('change', 0)) if tick_data.get('change') else None,
-                'change_percent': float(tick_data.get('change_percent', 0)) if tick_data.get('change_percent') else None,
-                'source': tick_data.get('source', 'angel_one_websocket'),
-                'market_status': 'open',
-                'received_at': TimezoneUtils.get_ist_now()  # When our system received it (naive IST)
-            }
-            
-            # Add to buffer for batch insert
-            if symbol not in self.tick_buffer:
-                self.tick_buffer[symbol] = []
-            
-            self.tick_buffer[symbol].append(tick_doc)
-            
-            # Check if we should flush buffer
-            await self._maybe_flush_buffer()
-            
-            # Broadcast to WebSocket clients immediately
-            await self._broadcast_tick(tick_doc)
-            
-            self.logger.info(f"📊 Stored tick: {symbol} @ ₹{price}")
-            return True
+            return await self._ingest(symbol, price, g('timestamp'), tick_data)
             
         except Exception as e:
             self.logger.error(f"Error storing tick data: {e}", exc_info=True)
             return False
     
-    async def store_tick_batch(self, ticks: List[Dict[str, Any]]) -> int:
-        """Store multiple ticks efficiently"""
-        stored_count = 0
+    def _parse_raw_tick(self, tick_data: Dict[str, Any]) -> Optional[Tuple[str, float]]:
+        """Extract (symbol, price) from a raw Angel One WebSocket tick, or None if invalid
+        
+        Validation is folded into the parse, so ltpc is converted exactly once.
+        """
+        try:
+            symbol = self._sym(tick_data['symbol'])
+            price = float(tick_data['ltpc'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            self.logger.warning(f"Invalid tick data: {tick_data}")
+            return None
+        
+        if not symbol or price <= 0:
+            self.logger.warning(f"Invalid tick data: {tick_data}")
+            return None
+        return symbol, price
+    
+    async def _ingest(self, symbol: str, price: float, timestamp: Optional[datetime],
+                      raw: Dict[str, Any]) -> bool:
+        """Shared ingest path behind store_tick and store_tick_data - market-hours
+        check, dedupe, build the tick document, queue it and broadcast it
+        
+        timestamp is the market time reported by the feed, if any; the time our
+        system received the tick (naive IST) is read once here and used for
+        every other time field.
+        """
+        # Check market hours against the cached flag
+        if not self._market_is_open():
+            self.logger.debug("Skipping after-hours tick for %s", symbol)
+            return False
+        
+        received_at = TimezoneUtils.get_ist_now()
+        tick_doc = self._build_tick_doc(symbol, price, timestamp or received_at, received_at, raw)
+        if tick_doc is None:
+            return False
         
-        for tick in ticks:
-            if await self.store_tick(tick):
-                stored_count += 1
+        # Queue for the symbol's background flush task
+        self._enqueue_for_flush(tick_doc)
         
-        # Force flush after batch
-        await self._flush_buffer()
+        # Hand off to the broadcast relay for WebSocket clients
+        self._broadcast_tick(tick_doc)
         
-        return stored_count
+        self.logger.debug("📊 Buffered tick: %s @ ₹%s", symbol, price)
+        return True
     
-    async def _maybe_flush_buffer(self) -> None:
-        """Flush buffer if conditions are met"""
+    def _build_tick_doc(self, symbol: str, price: float, timestamp: datetime,
+                        received_at: datetime, raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Record the latest price and build the tick document, or None if deduplicated"""
+        now_mono = time.monotonic()
+        self.latest_prices[symbol] = (now_mono, price)
+        
+        # Check if we should store this tick (deduplication)
+        if not self._should_store_tick(symbol, price, now_mono):
+            return None
+        
+        # Prepare tick document with production timezone handling
+        g = raw.get
+        timestamp_ms = TimezoneUtils.ist_to_unix_ms(timestamp)
+        tick_doc = {
+            # Deterministic primary key, so re-flushing the same tick is idempotent
+            '_id': f"{symbol}:{timestamp_ms}",
+            'symbol': symbol,
+            'price': price,
+            'timestamp': timestamp,  # Store as naive IST
+            'timestamp_ms': timestamp_ms,  # Epoch milliseconds, for integer-only consumers
+            'token': g('token', ''),
+            'exchange': g('exchange', 'NSE'),
+            'source': g('source', 'angel_one_websocket'),
+            'market_status': 'open',
+            'received_at': received_at
+        }
+        
+        # Optional fields are only stored when the feed provides them
+        for field, convert in _NUMERIC_SCHEMA:
+            value = g(field)
+            if value:
+                tick_doc[field] = convert(value)
+        
+        return tick_doc
+    
+    async def store_tick_batch(self, ticks: List[Dict[str, Any]]) -> int:
+        """Store multiple raw ticks in a single pass - one clock read and one
+        market-hours check for the whole batch, then queue and broadcast together"""
+        if not self._market_is_open():
+            self.logger.debug("Skipping after-hours batch of %d ticks", len(ticks))
+            return 0
+        
         now = TimezoneUtils.get_ist_now()
+        tick_docs = []
         
-        # Count total buffered ticks
-        total_ticks = sum(len(ticks) for ticks in self.tick_buffer.values())
+        for tick_data in ticks:
+            try:
+                parsed = self._parse_raw_tick(tick_data)
+                if parsed is None:
+                    continue
+                
+                symbol, price = parsed
+                tick_doc = self._build_tick_doc(symbol, price, now, now, tick_data)
+                if tick_doc is not None:
+                    tick_docs.append(tick_doc)
+            except Exception as e:
+                self.logger.error(f"Error storing tick: {e}", exc_info=True)
         
-        # Check flush conditions
-        should_flush = (
-            total_ticks >= self.buffer_size or
-            (now - self.last_flush).total_seconds() >= self.buffer_timeout
-        )
+        # Sequence number of this batch's last tick in each shard it touched
+        batch_seqs: Dict[_TickShard, int] = {}
+        for tick_doc in tick_docs:
+            shard = self._enqueue_for_flush(tick_doc)
+            batch_seqs[shard] = shard.appended
+        
+        for tick_doc in tick_docs:
+            self._broadcast_tick(tick_doc)
+        
+        # Flush those shards now rather than on the timer, and wait only until
+        # this batch's ticks are written - later appends don't hold us up
+        for shard in batch_seqs:
+            shard.wake.set()
+        await asyncio.gather(*(shard.wait_written(seq) for shard, seq in batch_seqs.items()))
+        
+        return len(tick_docs)
+    
+    def _enqueue_for_flush(self, tick_doc: Dict[str, Any]) -> _TickShard:
+        """Append a tick to its symbol's shard, starting the shard's flush task on first use
+        
+        Returns the shard, whose `appended` is now this tick's sequence number.
+        """
+        shard = self.shards[hash(tick_doc['symbol']) & (TICK_SHARDS - 1)]
+        if shard.flush_task is None or shard.flush_task.done():
+            shard.flush_task = asyncio.create_task(self._flush_loop(shard))
         
-        if should_flush:
-            await self._flush_buffer()
+        shard.buf.append(tick_doc)
+        shard.appended += 1
+        self._total_buffered += 1
+        if len(shard.buf) >= self.buffer_size:
+            shard.wake.set()
+        return shard
+    
+    async def _flush_loop(self, shard: _TickShard) -> None:
+        """Write a shard's buffer whenever it fills up, or every buffer_timeout seconds"""
+        while True:
+            try:
+                await asyncio.wait_for(shard.wake.wait(), timeout=self.buffer_timeout)
+            except asyncio.TimeoutError:
+                pass
+            shard.wake.clear()
+            
+            if not shard.buf:
+                continue
+            
+            # Swap in an empty buffer so ingest keeps appending while we write
+            batch, shard.buf = shard.buf, []
+            try:
+                await self._flush_buffer(batch)
+            finally:
+                self._total_buffered -= len(batch)
+                shard.mark_written(len(batch))
     
-    async def _flush_buffer(self) -> None:
-        """Flush all buffered ticks to database"""
-        if not self.tick_buffer:
+    async def _flush_buffer(self, all_docs: List[Dict[str, Any]]) -> None:
+        """Write a batch of buffered ticks to database"""
+        if not all_docs:
             return
         
         try:
             collection = self._get_collection()
-            all_docs = []
-            
-            # Collect all buffered documents
-            for symbol, ticks in self.tick_buffer.items():
-                all_docs.extend(ticks)
-            
-            if all_docs:
-                inserted_count = 0
-                # Use upsert to handle duplicate key errors gracefully
-                for doc in all_docs:
-                    try:
-                        # Create a filter that matches the unique index
-                        filter_doc = {
-                            'symbol': doc['symbol'],
-                            'price': doc['price'],
-                            'timestamp': doc['timestamp']
-                        }
-                        
-                        # Use replace_one with upsert=True to avoid duplicate key errors
-                        await collection.replace_one(
-                            filter_doc,
-                            doc,
-                            upsert=True
-                        )
-                        inserted_count += 1
-                        # Log individual successful tick stores
-                        self.logger.info(f"📊 Stored tick: {doc['symbol']} @ ₹{doc['price']}")
-                    except Exception as tick_error:
-                        # Log individual errors but continue processing
-                        self.logger.warning(f"⚠️ Error storing tick for {doc['symbol']}: {tick_error}")
+            
+            # Plain unordered insert of the whole buffer in a single round trip -
+            # the deterministic _id (symbol:timestamp_ms) makes a re-flushed
+            # tick fail with a duplicate key error instead of being stored twice
+            try:
+                await collection.insert_many(all_docs, ordered=False)
+                inserted_docs = all_docs
+            except BulkWriteError as bwe:
+                # Unordered writes keep going past individual failures
+                failed_indexes = set()
+                duplicate_count = 0
+                for write_error in bwe.details.get('writeErrors', []):
+                    failed_indexes.add(write_error.get('index'))
+                    if write_error.get('code') == DUPLICATE_KEY_ERROR:
+                        duplicate_count += 1
+                    else:
+                        self.logger.warning(f"⚠️ Error storing tick at batch index {write_error.get('index')}: {write_error.get('errmsg')}")
                 
-                self.logger.info(f"💾 Successfully stored {inserted_count} ticks to database")
+                inserted_docs = [doc for index, doc in enumerate(all_docs) if index not in failed_indexes]
+                if duplicate_count:
+                    self.logger.debug("Skipped %d duplicate ticks", duplicate_count)
+            
+            self.logger.info(f"💾 Successfully stored {len(inserted_docs)} ticks to database")
             
-            # Clear buffer
-            self.tick_buffer.clear()
-            self.last_flush = TimezoneUtils.get_ist_now()
+            await self._update_tick_counts(Counter(doc['symbol'] for doc in inserted_docs))
             
         except Exception as e:
             self.logger.error(f"Error flushing tick buffer: {e}", exc_info=True)
-            # Clear buffer anyway to prevent memory issues
-            self.tick_buffer.clear()
     
-    async def _broadcast_tick(self, tick_doc: Dict[str, Any]) -> None:
+    async def _update_tick_counts(self, symbol_counts: Counter) -> None:
+        """Pre-aggregate per-symbol tick counts in the tick_counts sidecar collection"""
+        if not symbol_counts:
+            return
+        
+        try:
+            counts_collection = self._get_counts_collection()
+            await counts_collection.bulk_write([
+                UpdateOne({'_id': symbol}, {'$inc': {'count': count}}, upsert=True)
+                for symbol, count in symbol_counts.items()
+            ], ordered=False)
+        except Exception as e:
+            self.logger.error(f"Error updating tick counts: {e}")
+    
+    def _broadcast_tick(self, tick_doc: Dict[str, Any]) -> None:
+        """Queue a tick for broadcast to WebSocket clients, starting the relay task on first use"""
+        if self.relay_task is None or self.relay_task.done():
+            self.relay_task = asyncio.create_task(self._relay_loop())
+        
+        symbol = tick_doc['symbol']
+        broadcast_data = _mk_broadcast(tick_doc, symbol, tick_doc['price'])
+        
+        queue = self.broadcast_queue
+        if queue.full():
+            # Clients only care about fresh prices - drop the oldest pending update
+            queue.get_nowait()
+        queue.put_nowait((symbol, broadcast_data))
+    
+    async def _relay_loop(self) -> None:
+        """Send queued tick broadcasts, yielding to the event loop between batches"""
+        queue = self.broadcast_queue
+        while True:
+            item = await queue.get()
+            sent = 0
+            while True:
+                await self._send_broadcast(*item)
+                sent += 1
+                if sent >= self.broadcast_batch or queue.empty():
+                    break
+                item = queue.get_nowait()
+            
+            # Let ingest and other tasks run before the next batch
+            await asyncio.sleep(0)
+    
+    async def _send_broadcast(self, symbol: str, broadcast_data: Dict[str, Any]) -> None:
         """Broadcast tick to WebSocket clients"""
         try:
-            symbol = tick_doc['symbol']
-            
-            # Prepare broadcast data with correct field names for WebSocket
-            broadcast_data = {
-                'symbol': symbol,
-                'ltpc': tick_doc['price'],  # Last traded price
-                'ch': tick_doc.get('change', 0),  # Change
-                'chp': tick_doc.get('change_percent', 0),  # Change percent
-                'high': tick_doc.get('high', tick_doc['price']),
-                'low': tick_doc.get('low', tick_doc['price']),
-                'open': tick_doc.get('open', tick_doc['price']),
-                'close': tick_doc['price'],  # Current price is the close
-                'volume': tick_doc.get('volume', 0),
-                'exchange': tick_doc.get('exchange', 'NSE'),
-                'received_at': tick_doc['timestamp']
-            }
-            
-            # Broadcast to all clients
-            await broadcast_market_data(broadcast_data)
-            
-            # Broadcast specific price update
-            await broadcast_price_update(symbol, broadcast_data)
+            # Broadcast to all clients and the symbol's subscribers concurrently
+            results = await asyncio.gather(
+                broadcast_market_data(broadcast_data),
+                broadcast_price_update(symbol, broadcast_data),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    self.logger.error(f"Error broadcasting tick: {result}")
             
         except Exception as e:
             self.logger.error(f"Error broadcasting tick: {e}")
     
-    def _validate_tick_data(self, data: Dict[str, Any]) -> bool:
-        """Validate incoming tick data"""
-        required_fields = ['symbol', 'ltpc']
+    def get_latest_price(self, symbol: str, max_age_seconds: float = 120.0) -> Optional[float]:
+        """Get the latest ingested price for a symbol from memory, if still fresh"""
+        entry = self.latest_prices.get(self._sym(symbol))
+        if entry is None:
+            return None
         
-        for field in required_fields:
-            if field not in data or data[field] is None:
-                self.logger.warning(f"Missing required field '{field}' in tick data")
-                return False
-        
-        try:
-            # Validate numeric fields
-            float(data['ltpc'])
-            return True
-        except (ValueError, TypeError):
-            self.logger.warning(f"Invalid numeric data in tick: {data}")
-            return False
+        received_mono, price = entry
+        if time.monotonic() - received_mono > max_age_seconds:
+            return None
+        return price
     
     async def get_latest_ticks(self, symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
         """Get latest ticks for a symbol"""
@@ -340,13 +598,18 @@ class TickDataService:
             collection = self._get_collection()
             
             query = {'symbol': symbol.upper()}
-            cursor = collection.find(query).sort('received_at', -1).limit(limit)
-            
-            ticks = []
-            async for doc in cursor:
-                # Convert ObjectId to string
-                doc['_id'] = str(doc['_id'])
-                ticks.append(doc)
+            cursor = (
+                collection.find(query)
+                .sort('received_at', -1)
+                .hint([('symbol', 1), ('received_at', 1)])
+                .limit(limit)
+            )
+            
+            ticks = await cursor.to_list(length=limit)
+            for doc in ticks:
+                # New ticks already use a "SYMBOL:ms" string _id; only older ones hold an ObjectId
+                if not isinstance(doc['_id'], str):
+                    doc['_id'] = str(doc['_id'])
             
             return ticks
             
@@ -354,12 +617,32 @@ class TickDataService:
             self.logger.error(f"Error getting latest ticks: {e}")
             return []
     
+    async def get_latest_tick_per_symbol(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the latest tick for each of several symbols in one round trip"""
+        try:
+            collection = self._get_collection()
+            
+            # Sort matches the (symbol, received_at) index so $first picks the newest tick
+            pipeline = [
+                {'$match': {'symbol': {'$in': [symbol.upper() for symbol in symbols]}}},
+                {'$sort': {'symbol': 1, 'received_at': -1}},
+                {'$group': {'_id': '$symbol', 'tick': {'$first': '$$ROOT'}}},
+                {'$project': {'tick._id': 0}}
+            ]
+            docs = await collection.aggregate(pipeline).to_list(length=None)
+            return {doc['_id']: doc['tick'] for doc in docs}
+            
+        except Exception as e:
+            self.logger.error(f"Error getting latest ticks per symbol: {e}")
+            return {}
+    
     async def get_ticks_for_timerange(
         self, 
         symbol: str, 
         start_time: datetime, 
         end_time: datetime,
-        use_received_at: bool = True
+        use_received_at: bool = True,
+        secondary_ok: bool = False
     ) -> List[Dict[str, Any]]:
         """Get ticks for a specific time range with production timezone handling
         
@@ -369,47 +652,167 @@ class TickDataService:
             end_time: End time for the range
             use_received_at: If True, use 'received_at' field instead of 'timestamp'
                            Default is True for accurate system timing. Set to False for market timing.
+            secondary_ok: If True, read from a secondary when available - for callers
+                          that tolerate replication lag (charts, diagnostics), not live signals
         """
         try:
-            collection = self._get_collection()
+            cursor = self._timerange_cursor(
+                symbol, start_time, end_time, use_received_at, _TIMERANGE_PROJECTION, secondary_ok
+            )
+            ticks = await cursor.to_list(length=None)
+            
+            self.logger.debug("Found %d ticks for %s in range %s to %s", len(ticks), symbol, start_time, end_time)
+            return ticks
+            
+        except Exception as e:
+            self.logger.error(f"Error getting ticks for timerange: {e}")
+            return []
+    
+    async def get_ticks_stream(
+        self,
+        symbol: str,
+        start_time: datetime,
+        end_time: datetime,
+        use_received_at: bool = True,
+        batch_size: int = STREAM_BATCH_SIZE,
+        secondary_ok: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a time range of ticks in time order, one batch in memory at a time
+        
+        Same ticks as get_ticks_for_timerange (including secondary_ok), for callers
+        that only iterate.
+        """
+        try:
+            cursor = self._timerange_cursor(
+                symbol, start_time, end_time, use_received_at, _TIMERANGE_PROJECTION, secondary_ok
+            ).batch_size(batch_size)
+            async for doc in cursor:
+                yield doc
+                
+        except Exception as e:
+            self.logger.error(f"Error streaming ticks for timerange: {e}")
+    
+    async def get_ticks_for_timerange_dual(
+        self,
+        symbol: str,
+        start_time: datetime,
+        end_time: datetime,
+        secondary_ok: bool = False
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Get a time range of ticks by both received_at and timestamp in one round trip
+        
+        Returns:
+            {'by_received_at': [...], 'by_timestamp': [...]}, each in time order -
+            the same ticks get_ticks_for_timerange returns for each field
+        """
+        try:
+            collection = self._get_read_collection() if secondary_ok else self._get_collection()
             
-            # Convert input times to naive IST for database query
-            start_time_ist = TimezoneUtils.to_ist(start_time)
-            end_time_ist = TimezoneUtils.to_ist(end_time)
-            
-            # Choose timestamp field based on use_received_at parameter
-            timestamp_field = 'received_at' if use_received_at else 'timestamp'
-            
-            # Debug logging to track timezone conversion
-            self.logger.debug(f"Timezone conversion for {symbol} using {timestamp_field}:")
-            self.logger.debug(f"  Input IST: {start_time} to {end_time}")
-            self.logger.debug(f"  Query IST: {start_time_ist} to {end_time_ist}")
-            
-            # Query with proper timezone handling
-            query = {
-                'symbol': symbol.upper(),
-                timestamp_field: {
-                    '$gte': start_time_ist,
-                    '$lte': end_time_ist
-                }
+            time_range = {
+                '$gte': TimezoneUtils.to_ist(start_time),
+                '$lte': TimezoneUtils.to_ist(end_time)
             }
             
-            cursor = collection.find(query).sort(timestamp_field, 1)
+            # $facet sub-pipelines can't use indexes, so the leading $match narrows to
+            # the union of both ranges - each $or branch uses its (symbol, field) index
+            pipeline = [
+                {'$match': {
+                    'symbol': symbol.upper(),
+                    '$or': [{'received_at': time_range}, {'timestamp': time_range}]
+                }},
+                {'$project': _TIMERANGE_PROJECTION},
+                {'$facet': {
+                    'by_received_at': [
+                        {'$match': {'received_at': time_range}},
+                        {'$sort': {'received_at': 1}}
+                    ],
+                    'by_timestamp': [
+                        {'$match': {'timestamp': time_range}},
+                        {'$sort': {'timestamp': 1}}
+                    ]
+                }}
+            ]
+            docs = await collection.aggregate(pipeline).to_list(length=1)
+            return docs[0] if docs else {'by_received_at': [], 'by_timestamp': []}
             
-            ticks = []
-            async for doc in cursor:
-                doc['_id'] = str(doc['_id'])
-                ticks.append(doc)
+        except Exception as e:
+            self.logger.error(f"Error getting dual ticks for timerange: {e}")
+            return {'by_received_at': [], 'by_timestamp': []}
+    
+    async def get_tick_arrays(
+        self,
+        symbol: str,
+        start_time: datetime,
+        end_time: datetime,
+        use_received_at: bool = True
+    ) -> Dict[str, array]:
+        """Get a time range of ticks as typed columns instead of a list of dicts
+        
+        Returns:
+            {'price': array('d'), 'timestamp_ms': array('q')}, in time order -
+            compact numeric columns that can be handed to numeric code as-is
+        """
+        prices = array('d')
+        timestamps_ms = array('q')
+        try:
+            cursor = self._timerange_cursor(symbol, start_time, end_time, use_received_at, _COLUMNS_PROJECTION)
             
-            self.logger.debug(f"Found {len(ticks)} ticks for {symbol} in range {start_time} to {end_time} using {timestamp_field}")
-            return ticks
+            # Stream batch by batch into the columns - no intermediate list of dicts
+            async for doc in cursor:
+                prices.append(doc['price'])
+                # Ticks stored before timestamp_ms was added only have the datetime
+                timestamps_ms.append(doc.get('timestamp_ms') or TimezoneUtils.ist_to_unix_ms(doc['timestamp']))
             
         except Exception as e:
-            self.logger.error(f"Error getting ticks for timerange: {e}")
-            return []
+            self.logger.error(f"Error getting tick arrays for timerange: {e}")
+        
+        return {'price': prices, 'timestamp_ms': timestamps_ms}
+    
+    def _timerange_cursor(self, symbol: str, start_time: datetime, end_time: datetime,
+                          use_received_at: bool, projection: Dict[str, int],
+                          secondary_ok: bool = False):
+        """Indexed, time-ordered cursor over a symbol's ticks in a time range"""
+        collection = self._get_read_collection() if secondary_ok else self._get_collection()
+        
+        # Convert input times to naive IST for database query
+        start_time_ist = TimezoneUtils.to_ist(start_time)
+        end_time_ist = TimezoneUtils.to_ist(end_time)
+        
+        # Choose timestamp field based on use_received_at parameter
+        timestamp_field = 'received_at' if use_received_at else 'timestamp'
+        
+        # Debug logging to track timezone conversion
+        self.logger.debug("Timezone conversion for %s using %s:", symbol, timestamp_field)
+        self.logger.debug("  Input IST: %s to %s", start_time, end_time)
+        self.logger.debug("  Query IST: %s to %s", start_time_ist, end_time_ist)
+        
+        # Query with proper timezone handling
+        query = {
+            'symbol': symbol.upper(),
+            timestamp_field: {
+                '$gte': start_time_ist,
+                '$lte': end_time_ist
+            }
+        }
+        
+        return (
+            collection.find(query, projection)
+            .sort(timestamp_field, 1)
+            .hint([('symbol', 1), (timestamp_field, 1)])
+            .batch_size(1000)
+        )
     
     async def cleanup_old_ticks(self, days_to_keep: int = 7) -> int:
-        """Clean up old tick data with production timezone handling"""
+        """Clean up old tick data with production timezone handling
+        
+        Routine expiry is done by the TTL index on received_at (see
+        settings.tick_data_retention_days); this only deletes when asked to
+        keep fewer days than that.
+        """
+        if days_to_keep >= settings.tick_data_retention_days:
+            self.logger.info(f"🗑️ Ticks older than {settings.tick_data_retention_days} days are expired by the TTL index")
+            return 0
+        
         try:
             # Calculate cutoff date in IST, then convert to naive UTC for database query
             cutoff_date_ist = TimezoneUtils.get_ist_now() - timedelta(days=days_to_keep)
@@ -432,29 +835,24 @@ class TickDataService:
         try:
             collection = self._get_collection()
             
-            # Total count
-            total_count = await collection.count_documents({})
-            
-            # Count by symbol
-            pipeline = [
-                {'$group': {'_id': '$symbol', 'count': {'$sum': 1}}},
-                {'$sort': {'count': -1}},
-                {'$limit': 10}
-            ]
+            # Total count from collection metadata rather than a full scan
+            total_count = await collection.estimated_document_count(maxTimeMS=STATS_MAX_TIME_MS)
             
-            symbol_stats = []
-            async for doc in collection.aggregate(pipeline):
-                symbol_stats.append(doc)
+            # Count by symbol, from the pre-aggregated sidecar rather than a tick scan
+            cursor = self._get_counts_collection().find({}).sort('count', -1).limit(10).max_time_ms(STATS_MAX_TIME_MS)
+            symbol_stats = [doc async for doc in cursor]
             
             # Latest tick
-            latest_tick = await collection.find_one({}, sort=[('received_at', -1)])
+            latest_tick = await collection.find_one(
+                {}, {'_id': 0, 'received_at': 1}, sort=[('received_at', -1)], max_time_ms=STATS_MAX_TIME_MS
+            )
             
             return {
                 'total_ticks': total_count,
                 'symbol_distribution': symbol_stats,
                 'latest_tick_time': latest_tick.get('received_at') if latest_tick else None,
-                'buffer_size': sum(len(ticks) for ticks in self.tick_buffer.values()),
-                'market_hours': self._is_market_hours()
+                'buffer_size': self._total_buffered,
+                'market_hours': self._market_is_open()
             }
             
         except Exception as e:
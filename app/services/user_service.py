@@ -11,14 +11,20 @@ logger = logging.getLogger(__name__)
 
 class UserService:
     def __init__(self):
-        pass  # Do not assign collection here
+        self.collection = None  # Resolved on first use, once the database is connected
+    
+    def _get_collection(self):
+        """Get the users collection"""
+        if self.collection is None:
+            self.collection = get_collection("users")
+        return self.collection
     
     async def create_user(self, user_data: dict) -> Optional[UserInDB]:
         """Create a new user."""
         try:
-            collection = get_collection("users")
-            # Check if user already exists
-            existing_user = await self.get_user_by_email(user_data["email"])
+            collection = self._get_collection()
+            # Check if user already exists - only the _id is needed
+            existing_user = await collection.find_one({"email": user_data["email"]}, {"_id": 1})
             if existing_user:
                 return None
             
@@ -27,12 +33,12 @@ class UserService:
             del user_data["password"]
             
             # Create user document
-            user_doc = UserModel(**user_data)
-            result = await collection.insert_one(user_doc.dict(by_alias=True))
+            user_doc = UserModel(**user_data).dict(by_alias=True)
+            result = await collection.insert_one(user_doc)
             
             if result.inserted_id:
-                created_user = await self.get_user_by_id(str(result.inserted_id))
-                return created_user
+                # The inserted document is the stored user - no need to read it back
+                return UserInDB(**user_doc)
             
             return None
         except Exception as e:
@@ -42,7 +48,7 @@ class UserService:
     async def get_user_by_email(self, email: str) -> Optional[UserInDB]:
         """Get user by email."""
         try:
-            collection = get_collection("users")
+            collection = self._get_collection()
             user_doc = await collection.find_one({"email": email})
             if user_doc:
                 return UserInDB(**user_doc)
@@ -54,7 +60,7 @@ class UserService:
     async def get_user_by_id(self, user_id: str) -> Optional[UserInDB]:
         """Get user by ID."""
         try:
-            collection = get_collection("users")
+            collection = self._get_collection()
             user_doc = await collection.find_one({"_id": ObjectId(user_id)})
             if user_doc:
                 return UserInDB(**user_doc)
@@ -81,7 +87,7 @@ class UserService:
     async def update_user(self, user_id: str, update_data: dict) -> Optional[UserInDB]:
         """Update user information."""
         try:
-            collection = get_collection("users")
+            collection = self._get_collection()
             # Remove password from update data if present
             if "password" in update_data:
                 update_data["hashed_password"] = get_password_hash(update_data["password"])
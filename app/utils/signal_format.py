@@ -0,0 +1,44 @@
+"""
+Signal Display Formatting
+V2 breakout signals store only numeric fields plus breakout_type
+('HIGH_BREAK' / 'LOW_BREAK'); the readable reason is built here at read time.
+Older signals that stored a pre-formatted reason/display_text keep it.
+"""
+
+from typing import Any, Dict
+
+
+def breakout_direction(signal: Dict[str, Any]) -> str:
+    """'HIGH' or 'LOW' for a signal's breakout - from breakout_type, else the stored reason text"""
+    breakout_type = signal.get('breakout_type')
+    if breakout_type:
+        return 'HIGH' if breakout_type == 'HIGH_BREAK' else 'LOW'
+    return 'HIGH' if 'high' in (signal.get('reason') or '').lower() else 'LOW'
+
+
+def breakout_reason(signal: Dict[str, Any]) -> str:
+    """Readable breakout reason - the stored one, or built from breakout_type/breakout_amount"""
+    reason = signal.get('reason')
+    if reason:
+        return reason
+
+    breakout_type = signal.get('breakout_type')
+    if not breakout_type:
+        return ''
+
+    nifty_price = signal.get('nifty_price') or 0
+    session_name = signal.get('session_name', '')
+    breakout_amount = signal.get('breakout_amount')
+    if breakout_type == 'HIGH_BREAK':
+        return f"High breakout: ₹{nifty_price:.2f} broke {session_name} high by +{breakout_amount}"
+    return f"Low breakout: ₹{nifty_price:.2f} broke {session_name} low by -{breakout_amount}"
+
+
+def breakout_display_text(signal: Dict[str, Any]) -> str:
+    """Display text for a signal - the stored one, or the breakout reason with the signal marker"""
+    display_text = signal.get('display_text')
+    if display_text:
+        return display_text
+
+    reason = breakout_reason(signal)
+    return f"🔥 {reason}" if reason else ''
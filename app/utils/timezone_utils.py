@@ -3,15 +3,28 @@ IST-First Timezone Utilities
 All timestamps are stored and processed in IST timezone - no UTC conversions needed!
 """
 
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime, timedelta, timezone, time as dtime
+from functools import lru_cache
+import calendar
+from zoneinfo import ZoneInfo
 from typing import Optional, Union
 import logging
+import sys
 
 logger = logging.getLogger(__name__)
 
 # Timezone constants - IST ONLY!
-IST = pytz.timezone('Asia/Kolkata')
+IST = ZoneInfo('Asia/Kolkata')
+
+# IST is a fixed UTC+05:30 with no DST - conversions use this plain offset
+# rather than a zone transition lookup
+IST_FIXED = timezone(timedelta(hours=5, minutes=30))
+IST_OFFSET_SEC = 5 * 3600 + 30 * 60
+
+# Naive Unix epoch - unix <-> IST conversions are plain offset arithmetic from here
+_EPOCH = datetime(1970, 1, 1)
+_ONE_SECOND = timedelta(seconds=1)
+_ONE_MS = timedelta(milliseconds=1)
 
 # Market hours in IST
 MARKET_OPEN_HOUR = 9
@@ -19,6 +32,50 @@ MARKET_OPEN_MINUTE = 15
 MARKET_CLOSE_HOUR = 15
 MARKET_CLOSE_MINUTE = 30
 
+# Trading weekdays as a bitmask - bit n set means weekday n (Monday=0) trades
+TRADING_DAYS_MASK = 0b0011111  # Monday to Friday
+
+# Market hours as minutes since midnight, for cheap integer comparisons
+MARKET_OPEN_MIN = MARKET_OPEN_HOUR * 60 + MARKET_OPEN_MINUTE
+MARKET_CLOSE_MIN = MARKET_CLOSE_HOUR * 60 + MARKET_CLOSE_MINUTE
+
+# Market hours as wall-clock times, compared directly against dt.time()
+MARKET_OPEN_TIME = dtime(MARKET_OPEN_HOUR, MARKET_OPEN_MINUTE)
+MARKET_CLOSE_TIME = dtime(MARKET_CLOSE_HOUR, MARKET_CLOSE_MINUTE)
+
+
+# Python 3.11+ fromisoformat parses a trailing 'Z' (UTC) itself
+_FROMISOFORMAT_ACCEPTS_Z = sys.version_info >= (3, 11)
+
+
+@lru_cache(maxsize=4096)
+def _to_ist_from_str(value: str) -> datetime:
+    """Parse an ISO string to naive IST, memoized - about 100 bytes per entry,
+    so roughly 400 KB when full. Raises ValueError on invalid input."""
+    if not _FROMISOFORMAT_ACCEPTS_Z and value[-1:] == 'Z':
+        value = value[:-1] + '+00:00'
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        # Already naive - assume it's IST
+        return dt
+    return dt.astimezone(IST_FIXED).replace(tzinfo=None)
+
+
+@lru_cache(maxsize=64)
+def _date_range_for_day(year: int, month: int, day: int) -> tuple[datetime, datetime]:
+    """Start and end of an IST day (naive datetimes), memoized per date"""
+    start_of_day = datetime(year, month, day, 0, 0, 0, 0)
+    end_of_day = datetime(year, month, day, 23, 59, 59, 999999)
+    return start_of_day, end_of_day
+
+
+@lru_cache(maxsize=64)
+def _market_hours_for_day(year: int, month: int, day: int) -> tuple[datetime, datetime]:
+    """Market open and close on an IST day (naive datetimes), memoized per date"""
+    market_open = datetime(year, month, day, MARKET_OPEN_HOUR, MARKET_OPEN_MINUTE, 0, 0)
+    market_close = datetime(year, month, day, MARKET_CLOSE_HOUR, MARKET_CLOSE_MINUTE, 0, 0)
+    return market_open, market_close
+
 
 class TimezoneUtils:
     """IST-first timezone utilities - everything is in IST!"""
@@ -26,7 +83,7 @@ class TimezoneUtils:
     @staticmethod
     def get_ist_now() -> datetime:
         """Get current time in IST timezone (naive for database storage)"""
-        return datetime.now(IST).replace(tzinfo=None)
+        return datetime.now(IST_FIXED).replace(tzinfo=None)
     
     @staticmethod
     def to_ist(dt: Union[datetime, str, None]) -> Optional[datetime]:
@@ -43,9 +100,9 @@ class TimezoneUtils:
             return None
             
         try:
-            # Handle string input
+            # Handle string input - parsed once per distinct string
             if isinstance(dt, str):
-                dt = datetime.fromisoformat(dt.replace('Z', '+00:00') if 'Z' in dt else dt)
+                return _to_ist_from_str(dt)
                 
             # Handle datetime object
             if isinstance(dt, datetime):
@@ -54,7 +111,7 @@ class TimezoneUtils:
                     return dt
                 else:
                     # Convert to IST and make naive
-                    return dt.astimezone(IST).replace(tzinfo=None)
+                    return dt.astimezone(IST_FIXED).replace(tzinfo=None)
             
             return None
             
@@ -91,11 +148,8 @@ class TimezoneUtils:
         else:
             date_obj = date
         
-        # Create start and end of day in IST (naive)
-        start_of_day = datetime(date_obj.year, date_obj.month, date_obj.day, 0, 0, 0, 0)
-        end_of_day = datetime(date_obj.year, date_obj.month, date_obj.day, 23, 59, 59, 999999)
-        
-        return start_of_day, end_of_day
+        # Start and end of day in IST (naive), cached per date
+        return _date_range_for_day(date_obj.year, date_obj.month, date_obj.day)
     
     @staticmethod
     def ist_market_hours(date: Union[datetime, str]) -> tuple[datetime, datetime]:
@@ -113,11 +167,8 @@ class TimezoneUtils:
         else:
             date_obj = date
         
-        # Create market hours in IST (naive)
-        market_open = datetime(date_obj.year, date_obj.month, date_obj.day, MARKET_OPEN_HOUR, MARKET_OPEN_MINUTE, 0, 0)
-        market_close = datetime(date_obj.year, date_obj.month, date_obj.day, MARKET_CLOSE_HOUR, MARKET_CLOSE_MINUTE, 0, 0)
-        
-        return market_open, market_close
+        # Market hours in IST (naive), cached per date
+        return _market_hours_for_day(date_obj.year, date_obj.month, date_obj.day)
     
     @staticmethod
     def is_market_hours(dt: Optional[datetime] = None) -> bool:
@@ -138,13 +189,13 @@ class TimezoneUtils:
         if dt is None:
             return False
         
-        # Check if weekday (Monday=0, Sunday=6)
-        if dt.weekday() >= 5:  # Saturday or Sunday
+        # Check trading weekday (Monday=0, Sunday=6) with a single bit test
+        if not (TRADING_DAYS_MASK >> dt.weekday()) & 1:
             return False
         
-        # Check time range (all naive IST datetimes)
-        market_open, market_close = TimezoneUtils.ist_market_hours(dt.date())
-        return market_open <= dt <= market_close
+        # Check time range as minutes since midnight (IST wall clock)
+        minutes = dt.hour * 60 + dt.minute
+        return MARKET_OPEN_MIN <= minutes <= MARKET_CLOSE_MIN
     
     @staticmethod
     def is_today_ist(dt: Union[datetime, str, None]) -> bool:
@@ -194,9 +245,7 @@ class TimezoneUtils:
         Returns:
             naive datetime in IST timezone
         """
-        utc_dt = datetime.fromtimestamp(timestamp, tz=pytz.UTC)
-        ist_dt = utc_dt.astimezone(IST)
-        return ist_dt.replace(tzinfo=None)
+        return _EPOCH + timedelta(seconds=timestamp + IST_OFFSET_SEC)
     
     @staticmethod
     def ist_to_unix_timestamp(dt: datetime) -> int:
@@ -209,8 +258,40 @@ class TimezoneUtils:
         Returns:
             Unix timestamp (seconds since epoch)
         """
-        ist_dt = IST.localize(dt)
-        return int(ist_dt.timestamp())
+        return calendar.timegm(dt.timetuple()) - IST_OFFSET_SEC
+    
+    @staticmethod
+    def ist_to_unix_ms(dt: datetime) -> int:
+        """
+        Convert a datetime to Unix epoch milliseconds
+        
+        Naive values are IST (as stored) and use the fixed IST offset - never
+        datetime.timestamp(), which would read them in the host's local zone.
+        Aware values are converted by their own offset.
+        """
+        if dt.tzinfo is None:
+            return (dt - _EPOCH) // _ONE_MS - IST_OFFSET_SEC * 1000
+        return int(dt.timestamp() * 1000)
+    
+    @staticmethod
+    def floor_to_interval(dt: datetime, minutes: int = 5) -> datetime:
+        """
+        Floor a datetime to the start of its N-minute candle (N must divide 60)
+        
+        Wall-clock arithmetic - no tz lookups, and works for naive IST or aware values
+        """
+        return dt - timedelta(minutes=dt.minute % minutes, seconds=dt.second, microseconds=dt.microsecond)
+    
+    @staticmethod
+    def ist_interval_start_unix(dt: datetime, minutes: int) -> int:
+        """
+        Unix timestamp of the IST N-minute interval containing a naive IST datetime
+        
+        Integer arithmetic on IST seconds - same result as flooring the datetime
+        and calling ist_to_unix_timestamp, without building either intermediate
+        """
+        ist_seconds = (dt - _EPOCH) // _ONE_SECOND
+        return ist_seconds - ist_seconds % (minutes * 60) - IST_OFFSET_SEC
 
 
 # Convenience functions for backward compatibility
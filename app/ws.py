@@ -1,84 +1,150 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status
 from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set, Union
 from jose import JWTError, jwt
 from .core.config import settings
+from .utils.signal_format import breakout_reason
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# JWT verification settings are fixed for the process - bind them once
+_JWT_KEY = settings.secret_key
+_JWT_ALGORITHMS = [settings.algorithm]
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize values the JSON encoder doesn't handle natively (datetimes, ObjectIds)"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _iso(value: Any) -> str:
+    """Format a timestamp field for a message once - datetimes to ISO, strings as-is"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value if isinstance(value, str) else ""
+
+
+try:
+    # orjson is considerably faster, but needs a compiled wheel
+    import orjson
+    
+    def serialize_message(message: Dict[str, Any]) -> str:
+        """Serialize a WebSocket message to JSON text once, for sending to many clients"""
+        return orjson.dumps(message, default=_json_default).decode()
+except ImportError:
+    import json
+    
+    def serialize_message(message: Dict[str, Any]) -> str:
+        """Serialize a WebSocket message to JSON text once, for sending to many clients"""
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+
+# Frames buffered per client before new broadcasts are dropped for it
+WS_OUTBOX_SIZE = 256
+
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.symbol_subscriptions: Dict[str, List[WebSocket]] = {}
+        self.active_connections: Set[WebSocket] = set()
+        self.symbol_subscriptions: Dict[str, Set[WebSocket]] = {}
+        # Reverse index - symbols each connection is subscribed to
+        self._subs_by_ws: Dict[WebSocket, Set[str]] = {}
+        # Per-connection outbox and the writer task draining it - broadcasts
+        # only enqueue, so a slow client never stalls the tick producer
+        self._outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
+        outbox = asyncio.Queue(maxsize=WS_OUTBOX_SIZE)
+        self._outboxes[websocket] = outbox
+        self._writers[websocket] = asyncio.create_task(self._writer(websocket, outbox))
         logger.info(f"WebSocket client connected. Total: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+            self.active_connections.discard(websocket)
             logger.info(f"WebSocket client disconnected. Total: {len(self.active_connections)}")
         
-        # Remove from symbol subscriptions
-        for symbol, connections in self.symbol_subscriptions.items():
-            if websocket in connections:
-                connections.remove(websocket)
+        self._outboxes.pop(websocket, None)
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+        
+        # Remove from this connection's symbol subscriptions only
+        for symbol in self._subs_by_ws.pop(websocket, ()):
+            connections = self.symbol_subscriptions.get(symbol)
+            if connections is not None:
+                connections.discard(websocket)
                 if not connections:
                     del self.symbol_subscriptions[symbol]
 
+    async def _writer(self, websocket: WebSocket, outbox: asyncio.Queue):
+        """Send queued frames to one client until it fails or disconnects"""
+        try:
+            while True:
+                text = await outbox.get()
+                await websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending message to WebSocket client: {e}")
+            self.disconnect(websocket)
+
+    def _enqueue(self, connections, text: str):
+        """Queue a serialized frame for each connection, dropping it for clients that are behind"""
+        for connection in connections:
+            outbox = self._outboxes.get(connection)
+            if outbox is None:
+                continue
+            try:
+                outbox.put_nowait(text)
+            except asyncio.QueueFull:
+                logger.debug("WebSocket outbox full - dropping frame for slow client")
+
     async def subscribe_to_symbol(self, websocket: WebSocket, symbol: str):
         """Subscribe a WebSocket connection to updates for a specific symbol"""
-        if symbol not in self.symbol_subscriptions:
-            self.symbol_subscriptions[symbol] = []
+        subscribers = self.symbol_subscriptions.setdefault(symbol, set())
         
-        if websocket not in self.symbol_subscriptions[symbol]:
-            self.symbol_subscriptions[symbol].append(websocket)
-            logger.info(f"WebSocket subscribed to {symbol}. Total subscribers: {len(self.symbol_subscriptions[symbol])}")
+        if websocket not in subscribers:
+            subscribers.add(websocket)
+            self._subs_by_ws.setdefault(websocket, set()).add(symbol)
+            logger.info(f"WebSocket subscribed to {symbol}. Total subscribers: {len(subscribers)}")
 
     async def unsubscribe_from_symbol(self, websocket: WebSocket, symbol: str):
         """Unsubscribe a WebSocket connection from updates for a specific symbol"""
-        if symbol in self.symbol_subscriptions and websocket in self.symbol_subscriptions[symbol]:
-            self.symbol_subscriptions[symbol].remove(websocket)
-            if not self.symbol_subscriptions[symbol]:
+        subscribers = self.symbol_subscriptions.get(symbol)
+        if subscribers is not None and websocket in subscribers:
+            subscribers.discard(websocket)
+            if not subscribers:
                 del self.symbol_subscriptions[symbol]
+            symbols = self._subs_by_ws.get(websocket)
+            if symbols is not None:
+                symbols.discard(symbol)
+                if not symbols:
+                    del self._subs_by_ws[websocket]
             logger.info(f"WebSocket unsubscribed from {symbol}")
 
-    async def broadcast(self, message: Dict[str, Any]):
-        """Broadcast message to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending message to WebSocket client: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+    async def broadcast(self, message: Union[Dict[str, Any], str]):
+        """Broadcast message (dict or pre-serialized JSON text) to all connected clients"""
+        text = message if isinstance(message, str) else serialize_message(message)
+        self._enqueue(self.active_connections, text)
 
-    async def broadcast_to_symbol(self, symbol: str, message: Dict[str, Any]):
-        """Broadcast message to clients subscribed to a specific symbol"""
+    async def broadcast_to_symbol(self, symbol: str, message: Union[Dict[str, Any], str]):
+        """Broadcast message (dict or pre-serialized JSON text) to clients subscribed to a specific symbol"""
         if symbol not in self.symbol_subscriptions:
             return
         
-        disconnected = []
-        for connection in self.symbol_subscriptions[symbol]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending message to WebSocket client for {symbol}: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for connection in disconnected:
-            await self.unsubscribe_from_symbol(connection, symbol)
-            self.disconnect(connection)
+        text = message if isinstance(message, str) else serialize_message(message)
+        self._enqueue(self.symbol_subscriptions[symbol], text)
 
 manager = ConnectionManager()
 
@@ -87,7 +153,7 @@ async def get_current_user_ws(token: str = None):
     if not token:
         return None
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
         email: str = payload.get("sub")
         if email is None:
             return None
@@ -161,16 +227,54 @@ async def websocket_endpoint(websocket: WebSocket):
 # Helper to broadcast new market data
 async def broadcast_market_data(data: Dict[str, Any]):
     """Broadcast market data to all connected clients"""
+    if not manager.active_connections:
+        return
+    
     message = {
         "type": "market_data",
         "data": data,
-        "timestamp": data.get("received_at", "").isoformat() if data.get("received_at") else ""
+        "timestamp": _iso(data.get("received_at"))
     }
     await manager.broadcast(message)
 
+# Latest price update per symbol waiting for the next coalesced flush
+_pending_price_updates: Dict[str, Dict[str, Any]] = {}
+_price_flush_task: Optional[asyncio.Task] = None
+
 # Helper to broadcast price updates for specific symbols
 async def broadcast_price_update(symbol: str, data: Dict[str, Any]):
     """Broadcast price update to clients subscribed to a specific symbol"""
+    global _price_flush_task
+    
+    # Don't build or serialize the frame when nobody is subscribed
+    if symbol not in manager.symbol_subscriptions:
+        return
+    
+    if settings.ws_price_coalesce_ms <= 0:
+        await _send_price_update(symbol, data)
+        return
+    
+    # Latest value wins - ticks superseded within the window are never sent
+    _pending_price_updates[symbol] = data
+    if _price_flush_task is None or _price_flush_task.done():
+        _price_flush_task = asyncio.create_task(_flush_price_updates())
+
+async def _flush_price_updates():
+    """Send the latest pending price update per symbol every coalescing window, until none are left"""
+    interval = settings.ws_price_coalesce_ms / 1000
+    while _pending_price_updates:
+        await asyncio.sleep(interval)
+        pending = dict(_pending_price_updates)
+        _pending_price_updates.clear()
+        for symbol, data in pending.items():
+            try:
+                await _send_price_update(symbol, data)
+            except Exception as e:
+                logger.error(f"Error broadcasting price update for {symbol}: {e}")
+
+async def _send_price_update(symbol: str, data: Dict[str, Any]):
+    """Build and broadcast one price_update frame"""
+    received_at_iso = _iso(data.get("received_at"))
     message = {
         "type": "price_update",
         "symbol": symbol,
@@ -185,9 +289,9 @@ async def broadcast_price_update(symbol: str, data: Dict[str, Any]):
             "close": data.get("close", 0),
             "volume": data.get("volume", 0),
             "exchange": data.get("exchange", ""),
-            "received_at": data.get("received_at", "").isoformat() if data.get("received_at") else ""
+            "received_at": received_at_iso
         },
-        "timestamp": data.get("received_at", "").isoformat() if data.get("received_at") else ""
+        "timestamp": received_at_iso
     }
     await manager.broadcast_to_symbol(symbol, message)
 
@@ -206,6 +310,7 @@ async def broadcast_chart_update(symbol: str, timeframe: str, chart_data: List[D
 # Helper to broadcast trading signals
 async def broadcast_signal(signal_data: Dict[str, Any]):
     """Broadcast trading signal to all connected clients"""
+    timestamp_iso = _iso(signal_data.get("timestamp"))
     message = {
         "type": "trading_signal",
         "signal": {
@@ -214,30 +319,35 @@ async def broadcast_signal(signal_data: Dict[str, Any]):
             "symbol": signal_data.get("symbol", "NIFTY"),
             "future_symbol": signal_data.get("future_symbol"),
             "session_name": signal_data.get("session_name"),
-            "reason": signal_data.get("reason"),
+            "reason": breakout_reason(signal_data),
             "confidence": signal_data.get("confidence", 50),
             "nifty_price": signal_data.get("nifty_price"),
             "future_price": signal_data.get("future_price"),
             "session_high": signal_data.get("session_high"),
             "session_low": signal_data.get("session_low"),
+            "breakout_type": signal_data.get("breakout_type"),
+            "breakout_amount": signal_data.get("breakout_amount"),
             "vwap_nifty": signal_data.get("vwap_nifty"),
             "vwap_future": signal_data.get("vwap_future"),
-            "timestamp": signal_data.get("timestamp").isoformat() if signal_data.get("timestamp") else "",
+            "timestamp": timestamp_iso,
             "status": signal_data.get("status", "ACTIVE")
         },
-        "timestamp": signal_data.get("timestamp").isoformat() if signal_data.get("timestamp") else ""
+        "timestamp": timestamp_iso
     }
     
+    # Serialize once - the same frame goes to all clients and both symbol audiences
+    text = serialize_message(message)
+    
     # Broadcast to all clients
-    await manager.broadcast(message)
+    await manager.broadcast(text)
     
     # Also broadcast to specific symbol subscribers
     symbol = signal_data.get("symbol", "NIFTY")
     future_symbol = signal_data.get("future_symbol")
     
-    await manager.broadcast_to_symbol(symbol, message)
+    await manager.broadcast_to_symbol(symbol, text)
     if future_symbol and future_symbol != symbol:
-        await manager.broadcast_to_symbol(future_symbol, message)
+        await manager.broadcast_to_symbol(future_symbol, text)
 
 # Helper to broadcast session status updates
 async def broadcast_session_update(session_data: Dict[str, Any]):
@@ -4,24 +4,49 @@ Cleanup script to remove old BANKNIFTY, FINNIFTY, SENSEX data
 Keep only NIFTY and NIFTY futures data
 """
 
+import argparse
 import asyncio
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.core.database import connect_to_mongo, get_collection
+from bson import encode
+from bson.raw_bson import RawBSONDocument
+
+from app.core.database import mongo_connection, get_collection
 from app.core.symbols import SymbolsConfig
 
-async def cleanup_old_symbols():
+# Symbols to keep (NIFTY only) - resolved once from the central config
+VALID_SYMBOLS = frozenset(SymbolsConfig.get_symbol_names())
+
+# Filter for symbols to remove, BSON-encoded once and reused by every find/delete batch
+INVALID_SYMBOL_FILTER = RawBSONDocument(encode({"symbol": {"$nin": sorted(VALID_SYMBOLS)}}))
+
+# Symbol-prefixed index per collection (as created at startup) - lets symbol
+# counts run as index-only scans without fetching documents
+SYMBOL_INDEXES = {
+    "tick_data": [("symbol", 1), ("received_at", 1)],
+    "market_data": [("symbol", 1), ("received_at", -1)],
+}
+
+# Documents removed per delete round trip - keeps each delete short so live ingest isn't blocked
+DEFAULT_BATCH_SIZE = 5000
+
+async def delete_in_batches(collection, query, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Delete documents matching query batch_size _ids at a time, returning the total deleted"""
+    deleted = 0
+    while True:
+        docs = await collection.find(query, {"_id": 1}).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            return deleted
+        
+        result = await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        deleted += result.deleted_count
+
+async def cleanup_old_symbols(batch_size: int = DEFAULT_BATCH_SIZE):
     """Remove old symbol data that's no longer needed"""
     try:
-        # Connect to database
-        await connect_to_mongo()
-        print("✅ Connected to database")
-        
-        # Get valid symbols (NIFTY only)
-        valid_symbols = set(SymbolsConfig.get_symbol_names())
-        print(f"✅ Valid symbols: {valid_symbols}")
+        print(f"✅ Valid symbols: {set(VALID_SYMBOLS)}")
         
         # Collections to clean
         collections_to_clean = ["tick_data", "market_data", "signals"]
@@ -32,23 +57,18 @@ async def cleanup_old_symbols():
             try:
                 collection = get_collection(collection_name)
                 
-                # Count documents with invalid symbols
-                invalid_query = {"symbol": {"$nin": list(valid_symbols)}}
-                invalid_count = await collection.count_documents(invalid_query)
+                # Metadata-only count - skip empty collections without touching any documents
+                if await collection.estimated_document_count() == 0:
+                    print(f"✅ {collection_name} is empty - nothing to clean")
+                    continue
                 
-                if invalid_count > 0:
-                    print(f"\n📊 Found {invalid_count} invalid records in {collection_name}")
-                    
-                    # Get sample of what would be deleted
-                    sample_docs = await collection.find(invalid_query).limit(5).to_list(length=5)
-                    print(f"   Sample symbols to be removed: {[doc.get('symbol', 'Unknown') for doc in sample_docs]}")
-                    
-                    # Delete invalid symbols
-                    result = await collection.delete_many(invalid_query)
-                    deleted_count = result.deleted_count
+                # Delete invalid symbols directly - the symbols being removed were
+                # already listed by show_current_symbols before confirmation
+                deleted_count = await delete_in_batches(collection, INVALID_SYMBOL_FILTER, batch_size)
+                
+                if deleted_count:
                     total_deleted += deleted_count
-                    
-                    print(f"✅ Deleted {deleted_count} records from {collection_name}")
+                    print(f"✅ Deleted {deleted_count} invalid records from {collection_name}")
                 else:
                     print(f"✅ No invalid records in {collection_name}")
                     
@@ -58,7 +78,7 @@ async def cleanup_old_symbols():
         print(f"\n🎯 CLEANUP SUMMARY:")
         print(f"   Total records deleted: {total_deleted}")
         print(f"   Collections cleaned: {len(collections_to_clean)}")
-        print(f"   Remaining valid symbols: {valid_symbols}")
+        print(f"   Remaining valid symbols: {set(VALID_SYMBOLS)}")
         print(f"✅ Database now contains only NIFTY and NIFTY futures data")
         
     except Exception as e:
@@ -67,9 +87,7 @@ async def cleanup_old_symbols():
 async def show_current_symbols():
     """Show what symbols are currently in the database"""
     try:
-        await connect_to_mongo()
-        
-        collections_to_check = ["tick_data", "market_data"]
+        collections_to_check = list(SYMBOL_INDEXES)
         
         print("\n📊 CURRENT SYMBOLS IN DATABASE:")
         print("-" * 50)
@@ -78,20 +96,30 @@ async def show_current_symbols():
             try:
                 collection = get_collection(collection_name)
                 
-                # Get unique symbols
-                pipeline = [
-                    {"$group": {"_id": "$symbol", "count": {"$sum": 1}}},
-                    {"$sort": {"count": -1}}
-                ]
+                # Get unique symbols - distinct walks the symbol-prefixed index
+                symbols = await collection.distinct("symbol")
                 
-                symbols_data = await collection.aggregate(pipeline).to_list(length=None)
+                symbols_data = []
+                if symbols:
+                    # Count only the symbols found - projecting just symbol keeps the
+                    # plan covered by the hinted index, so no documents are fetched
+                    pipeline = [
+                        {"$match": {"symbol": {"$in": symbols}}},
+                        {"$project": {"_id": 0, "symbol": 1}},
+                        {"$group": {"_id": "$symbol", "count": {"$sum": 1}}}
+                    ]
+                    symbols_data = await collection.aggregate(
+                        pipeline, allowDiskUse=False, hint=SYMBOL_INDEXES[collection_name]
+                    ).to_list(length=None)
+                    # A handful of symbols - sort client-side
+                    symbols_data.sort(key=lambda item: item["count"], reverse=True)
                 
                 print(f"\n{collection_name.upper()}:")
                 if symbols_data:
                     for item in symbols_data:
                         symbol = item["_id"]
                         count = item["count"]
-                        status = "✅ VALID" if symbol in SymbolsConfig.get_symbol_names() else "❌ INVALID"
+                        status = "✅ VALID" if symbol in VALID_SYMBOLS else "❌ INVALID"
                         print(f"   {symbol:<20} | {count:>8} records | {status}")
                 else:
                     print("   No data found")
@@ -102,26 +130,34 @@ async def show_current_symbols():
     except Exception as e:
         print(f"❌ Failed to show symbols: {e}")
 
-async def main():
+async def main(batch_size: int = DEFAULT_BATCH_SIZE):
     print("=" * 60)
     print("NIFTY-ONLY DATABASE CLEANUP")
     print("=" * 60)
     
-    # Show current state
-    await show_current_symbols()
-    
-    # Ask for confirmation
-    print(f"\n⚠️  This will delete all data for symbols other than: {SymbolsConfig.get_symbol_names()}")
-    response = input("\nDo you want to proceed with cleanup? (y/N): ").strip().lower()
-    
-    if response == 'y':
-        print("\n🧹 Starting cleanup...")
-        await cleanup_old_symbols()
+    # One connection for the whole run, closed on exit
+    async with mongo_connection():
+        print("✅ Connected to database")
         
-        print("\n📊 Showing updated symbol list...")
+        # Show current state
         await show_current_symbols()
-    else:
-        print("❌ Cleanup cancelled")
+        
+        # Ask for confirmation
+        print(f"\n⚠️  This will delete all data for symbols other than: {list(SymbolsConfig.get_symbol_names())}")
+        response = input("\nDo you want to proceed with cleanup? (y/N): ").strip().lower()
+        
+        if response == 'y':
+            print("\n🧹 Starting cleanup...")
+            await cleanup_old_symbols(batch_size)
+            
+            print("\n📊 Showing updated symbol list...")
+            await show_current_symbols()
+        else:
+            print("❌ Cleanup cancelled")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Remove data for symbols other than NIFTY and NIFTY futures")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"documents deleted per round trip (default: {DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
\ No newline at end of file
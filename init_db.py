@@ -8,6 +8,8 @@ Run this script once to set up the database schema.
 import asyncio
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel
+from pymongo.errors import CollectionInvalid, OperationFailure
 from app.core.config import settings
 
 # Configure logging
@@ -15,11 +17,13 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def init_database():
+async def init_database(client: AsyncIOMotorClient = None):
     """Initialize the database with collections and indexes."""
+    owns_client = client is None
     try:
-        # Connect to MongoDB
-        client = AsyncIOMotorClient(settings.mongodb_url)
+        # Connect to MongoDB, unless the caller shares its client
+        if owns_client:
+            client = AsyncIOMotorClient(settings.mongodb_url)
         db = client[settings.database_name]
         
         logger.info(f"Connected to MongoDB: {settings.database_name}")
@@ -28,6 +32,7 @@ async def init_database():
         await create_users_collection(db)
         await create_market_data_collection(db)
         await create_signals_collection(db)
+        await create_tick_data_collection(db)
         
         logger.info("Database initialization completed successfully!")
         
@@ -35,7 +40,8 @@ async def init_database():
         logger.error(f"Database initialization failed: {e}")
         raise
     finally:
-        client.close()
+        if owns_client and client is not None:
+            client.close()
 
 
 async def create_users_collection(db):
@@ -43,10 +49,12 @@ async def create_users_collection(db):
     try:
         collection = db.users
         
-        # Create indexes
-        await collection.create_index("email", unique=True)
-        await collection.create_index("is_active")
-        await collection.create_index("created_at")
+        # Create indexes - one createIndexes command per collection
+        await collection.create_indexes([
+            IndexModel("email", unique=True, background=True),
+            IndexModel("is_active", background=True),
+            IndexModel("created_at", background=True),
+        ])
         
         logger.info("Users collection and indexes created")
         
@@ -58,14 +66,32 @@ async def create_users_collection(db):
 async def create_market_data_collection(db):
     """Create market_data collection with indexes."""
     try:
+        # Pre-create with zstd block compression - smaller on disk than the
+        # default snappy, so less I/O on every scan
+        try:
+            await db.create_collection(
+                "market_data",
+                storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}}
+            )
+            logger.info("Market data collection created with zstd compression")
+        except CollectionInvalid:
+            pass  # Already exists - compression is fixed at creation
+        except OperationFailure as e:
+            logger.warning(f"Could not create market_data with zstd compression: {e}")
+        
         collection = db.market_data
         
-        # Create indexes
-        await collection.create_index("tk")  # Token/Symbol
-        await collection.create_index([("received_at", -1)])  # Descending for latest first
-        await collection.create_index("source")
-        await collection.create_index("processed")
-        await collection.create_index([("tk", 1), ("received_at", -1)])  # Compound index
+        # Create indexes - one createIndexes command per collection
+        await collection.create_indexes([
+            # tk and source lookups use the leading field of their compound indexes
+            IndexModel([("received_at", -1)], background=True),  # Descending for latest first
+            IndexModel("processed", background=True),
+            IndexModel([("tk", 1), ("received_at", -1)], background=True),  # Compound index
+            IndexModel([("symbol", 1), ("received_at", -1)], background=True),  # Per-symbol latest/range queries
+            # Live websocket rows only - partial, so REST/backfill rows add no entries
+            IndexModel([("received_at", -1)], name="ws_recv",
+                       partialFilterExpression={"source": "angel_one_websocket"}, background=True),
+        ])
         
         logger.info("Market data collection and indexes created")
         
@@ -79,13 +105,15 @@ async def create_signals_collection(db):
     try:
         collection = db.signals
         
-        # Create indexes
-        await collection.create_index("user_id")
-        await collection.create_index("symbol")
-        await collection.create_index("status")
-        await collection.create_index([("created_at", -1)])
-        await collection.create_index([("user_id", 1), ("status", 1)])  # Compound index
-        await collection.create_index([("symbol", 1), ("created_at", -1)])  # Compound index
+        # Create indexes - one createIndexes command per collection
+        await collection.create_indexes([
+            # Equality fields first, then the created_at sort - each compound
+            # also serves its leading-field prefixes, so no single-field copies
+            IndexModel([("created_at", -1)], background=True),  # Unfiltered history, newest first
+            IndexModel([("user_id", 1), ("status", 1), ("created_at", -1)], background=True),
+            IndexModel([("symbol", 1), ("created_at", -1)], background=True),
+            IndexModel([("status", 1), ("created_at", -1)], background=True),  # Active signals, newest first
+        ])
         
         logger.info("Signals collection and indexes created")
         
@@ -94,10 +122,35 @@ async def create_signals_collection(db):
         raise
 
 
-async def verify_database():
+async def create_tick_data_collection(db):
+    """Create tick_data collection with indexes."""
+    try:
+        collection = db.tick_data
+        
+        # Create indexes - one createIndexes command per collection
+        await collection.create_indexes([
+            # Every time-range read matches symbol, ranges on the time field and
+            # projects a few fields - these keep those reads on an IXSCAN
+            IndexModel([("symbol", 1), ("received_at", 1)], background=True),
+            IndexModel([("symbol", 1), ("timestamp", 1)], background=True),
+            # TTL - the server expires old ticks in the background
+            IndexModel("received_at", expireAfterSeconds=settings.tick_data_retention_days * 86400,
+                       background=True),
+        ])
+        
+        logger.info("Tick data collection and indexes created")
+        
+    except Exception as e:
+        logger.error(f"Error creating tick_data collection: {e}")
+        raise
+
+
+async def verify_database(client: AsyncIOMotorClient = None):
     """Verify that all collections and indexes exist."""
+    owns_client = client is None
     try:
-        client = AsyncIOMotorClient(settings.mongodb_url)
+        if owns_client:
+            client = AsyncIOMotorClient(settings.mongodb_url)
         db = client[settings.database_name]
         
         # List all collections
@@ -105,7 +158,7 @@ async def verify_database():
         logger.info(f"Collections in database: {collections}")
         
         # Check indexes for each collection
-        for collection_name in ['users', 'market_data', 'signals']:
+        for collection_name in ['users', 'market_data', 'signals', 'tick_data']:
             if collection_name in collections:
                 collection = db[collection_name]
                 indexes = await collection.list_indexes().to_list(length=None)
@@ -113,23 +166,33 @@ async def verify_database():
             else:
                 logger.warning(f"Collection {collection_name} not found")
         
-        client.close()
+        if owns_client:
+            client.close()
         
     except Exception as e:
         logger.error(f"Error verifying database: {e}")
 
 
+async def main():
+    """Initialize then verify over one client - a single TLS handshake and server discovery."""
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    try:
+        await init_database(client)
+        
+        # Verify the setup
+        print("\n🔍 Verifying database setup...")
+        await verify_database(client)
+    finally:
+        client.close()
+
+
 if __name__ == "__main__":
     print("🚀 Initializing Trading Signals Database...")
     print(f"Database: {settings.database_name}")
     print(f"MongoDB URL: {settings.mongodb_url.split('@')[1]}")  # Hide credentials
     
-    # Run initialization
-    asyncio.run(init_database())
-    
-    # Verify the setup
-    print("\n🔍 Verifying database setup...")
-    asyncio.run(verify_database())
+    # Run initialization and verification
+    asyncio.run(main())
     
     print("\n✅ Database initialization completed!")
     print("You can now start the application with: python run.py") 
\ No newline at end of file
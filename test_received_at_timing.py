@@ -10,19 +10,13 @@ from datetime import datetime, timedelta
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.core.database import connect_to_mongo
-from app.services.tick_data_service import tick_data_service
+from app.core.database import mongo_connection
+from app.services.tick_data_service import tick_data_service, dump_tick
 from app.utils.timezone_utils import TimezoneUtils
 
-async def test_received_at_timing():
+async def test_received_at_timing(now_ist: datetime):
     """Test that tick data queries use received_at correctly"""
     try:
-        # Connect to database
-        await connect_to_mongo()
-        print("✅ Connected to database")
-        
-        # Get current IST time
-        now_ist = TimezoneUtils.get_ist_now()
         start_time = now_ist - timedelta(hours=1)  # Look back 1 hour
         end_time = now_ist
         
@@ -31,18 +25,17 @@ async def test_received_at_timing():
         print(f"\n🔍 Testing tick data retrieval for {symbol}")
         print(f"Time range: {start_time.strftime('%H:%M:%S')} to {end_time.strftime('%H:%M:%S')} IST")
         
-        # Test with received_at field (now default)
-        print(f"\n📊 Testing with 'received_at' field (default):")
-        ticks_received_at = await tick_data_service.get_ticks_for_timerange(
-            symbol, start_time, end_time
+        # Fetch by received_at (default) and timestamp (market timing) in one round trip
+        ticks = await tick_data_service.get_ticks_for_timerange_dual(
+            symbol, start_time, end_time, secondary_ok=True
         )
+        ticks_received_at = ticks['by_received_at']
+        ticks_timestamp = ticks['by_timestamp']
+        
+        print(f"\n📊 Testing with 'received_at' field (default):")
         print(f"Found {len(ticks_received_at)} ticks using 'received_at' field")
         
-        # Test with timestamp field (market timing)
         print(f"\n📊 Testing with 'timestamp' field (market time):")
-        ticks_timestamp = await tick_data_service.get_ticks_for_timerange(
-            symbol, start_time, end_time, use_received_at=False
-        )
         print(f"Found {len(ticks_timestamp)} ticks using 'timestamp' field")
         
         # Compare results
@@ -51,32 +44,24 @@ async def test_received_at_timing():
         print(f"   received_at field: {len(ticks_received_at)} ticks")
         
         if len(ticks_timestamp) > 0:
-            sample_tick = ticks_timestamp[0]
             print(f"\n📝 SAMPLE TICK STRUCTURE:")
-            print(f"   Symbol: {sample_tick.get('symbol')}")
-            print(f"   Price: ₹{sample_tick.get('price', 0):.2f}")
-            print(f"   timestamp: {sample_tick.get('timestamp')}")
-            print(f"   received_at: {sample_tick.get('received_at')}")
-            print(f"   Source: {sample_tick.get('source')}")
+            print(dump_tick(ticks_timestamp[0]))
         
         # Show timestamp differences if both exist
         if len(ticks_timestamp) > 0 and len(ticks_received_at) > 0:
             print(f"\n⏰ TIMING ANALYSIS:")
-            for i in range(min(3, len(ticks_timestamp), len(ticks_received_at))):
-                ts_tick = ticks_timestamp[i]
-                ra_tick = ticks_received_at[i] if i < len(ticks_received_at) else None
+            # zip stops at the shorter list - no index bounds checks needed
+            for i, (ts_tick, ra_tick) in enumerate(zip(ticks_timestamp[:3], ticks_received_at[:3]), 1):
+                ts_time = ts_tick.get('timestamp')
+                ra_time = ra_tick.get('received_at')
+                
+                print(f"   Tick {i}:")
+                print(f"     timestamp:   {ts_time}")
+                print(f"     received_at: {ra_time}")
                 
-                if ra_tick:
-                    ts_time = ts_tick.get('timestamp')
-                    ra_time = ra_tick.get('received_at')
-                    
-                    print(f"   Tick {i+1}:")
-                    print(f"     timestamp:   {ts_time}")
-                    print(f"     received_at: {ra_time}")
-                    
-                    if ts_time and ra_time:
-                        diff = (ra_time - ts_time).total_seconds() if ra_time > ts_time else (ts_time - ra_time).total_seconds()
-                        print(f"     Difference:  {diff:.2f} seconds")
+                if ts_time and ra_time:
+                    diff = abs((ra_time - ts_time).total_seconds())
+                    print(f"     Difference:  {diff:.2f} seconds")
         
         print(f"\n✅ SYSTEM-WIDE TIMING UPDATE:")
         print(f"   ✅ ALL tick_data queries now use 'received_at' field by default")
@@ -93,16 +78,14 @@ async def test_received_at_timing():
         traceback.print_exc()
         return False
 
-async def test_candle_data_generation():
+async def test_candle_data_generation(now_ist: datetime):
     """Test 5-minute candle generation with received_at timing"""
     try:
         # Test the signal detection service candle generation
         from app.services.signal_detection_service import signal_detection_service
         
-        now_ist = TimezoneUtils.get_ist_now()
         # Get current 5-minute candle window
-        candle_minute = (now_ist.minute // 5) * 5
-        candle_start = now_ist.replace(minute=candle_minute, second=0, microsecond=0)
+        candle_start = TimezoneUtils.floor_to_interval(now_ist, 5)
         candle_end = candle_start + timedelta(minutes=5)
         
         print(f"\n🕐 Testing 5-minute candle generation:")
@@ -136,9 +119,13 @@ async def main():
     print("Testing received_at field usage for accurate timing")
     print("=" * 60)
     
-    # Run tests
-    timing_test = await test_received_at_timing()
-    candle_test = await test_candle_data_generation()
+    # Run tests over one connection, closed on exit
+    async with mongo_connection():
+        print("✅ Connected to database")
+        # Both tests look at the same moment - read the IST clock once
+        now_ist = TimezoneUtils.get_ist_now()
+        timing_test = await test_received_at_timing(now_ist)
+        candle_test = await test_candle_data_generation(now_ist)
     
     print(f"\n" + "=" * 60)
     print("TEST RESULTS:")
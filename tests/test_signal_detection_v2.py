@@ -0,0 +1,68 @@
+"""V2 breakout signals are broadcast only once they are stored"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("motor")
+
+from pymongo.errors import DuplicateKeyError
+
+from app.services.signal_detection_service_v2 import SignalDetectionServiceV2
+
+
+SESSION_DOC = {
+    'session_name': 'Morning Opening',
+    'symbols_data': {'NIFTY': {'high': 24640.0, 'low': 24580.0}},
+}
+
+
+class _FakeSignalsCollection:
+    def __init__(self, error=None):
+        self.error = error
+        self.inserted = []
+
+    async def insert_one(self, doc):
+        if self.error is not None:
+            raise self.error
+        self.inserted.append(doc)
+
+
+def _generate(service, collection):
+    broadcasts = []
+
+    async def record_broadcast(signal_data):
+        broadcasts.append(signal_data)
+
+    service.signals_collection = collection
+    service._broadcast_signal = record_broadcast
+    signal_id = asyncio.run(service._generate_breakout_signal(
+        SESSION_DOC, "HIGH_BREAK", datetime(2025, 8, 4, 9, 35), 24650.5, 24710.0, 10.5
+    ))
+    return signal_id, broadcasts
+
+
+def test_stored_signal_is_broadcast():
+    collection = _FakeSignalsCollection()
+    signal_id, broadcasts = _generate(SignalDetectionServiceV2(), collection)
+
+    assert signal_id is not None
+    assert len(collection.inserted) == 1
+    assert [b['id'] for b in broadcasts] == [signal_id]
+
+
+def test_duplicate_signal_is_not_broadcast():
+    collection = _FakeSignalsCollection(DuplicateKeyError("E11000 duplicate key"))
+    signal_id, broadcasts = _generate(SignalDetectionServiceV2(), collection)
+
+    assert signal_id is None
+    assert broadcasts == []
+
+
+def test_failed_save_is_not_broadcast_or_reported_as_generated():
+    collection = _FakeSignalsCollection(RuntimeError("connection reset"))
+    signal_id, broadcasts = _generate(SignalDetectionServiceV2(), collection)
+
+    assert signal_id is None
+    assert broadcasts == []
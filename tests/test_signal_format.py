@@ -0,0 +1,64 @@
+"""Display formatting of stored signals - v2 signals keep only breakout_type/breakout_amount"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from app.utils.signal_format import breakout_direction, breakout_reason, breakout_display_text
+
+
+HIGH_BREAK_SIGNAL = {
+    'id': 'Morning_Opening_BUY_CALL_093500',
+    'session_name': 'Morning Opening',
+    'signal_type': 'BUY_CALL',
+    'timestamp': datetime(2025, 8, 4, 9, 35),
+    'nifty_price': 24650.5,
+    'future_price': 24710.0,
+    'breakout_type': 'HIGH_BREAK',
+    'breakout_amount': 12.5,
+    'status': 'ACTIVE',
+}
+
+
+def test_breakout_direction_uses_breakout_type():
+    assert breakout_direction(HIGH_BREAK_SIGNAL) == 'HIGH'
+    assert breakout_direction({**HIGH_BREAK_SIGNAL, 'breakout_type': 'LOW_BREAK'}) == 'LOW'
+
+
+def test_breakout_direction_falls_back_to_stored_reason():
+    assert breakout_direction({'reason': 'High breakout: ₹100.00 broke X high by +1'}) == 'HIGH'
+    assert breakout_direction({'reason': 'Low breakout: ₹100.00 broke X low by -1'}) == 'LOW'
+
+
+def test_reason_and_display_text_built_from_breakout_fields():
+    reason = breakout_reason(HIGH_BREAK_SIGNAL)
+    assert reason == "High breakout: ₹24650.50 broke Morning Opening high by +12.5"
+    assert breakout_display_text(HIGH_BREAK_SIGNAL) == f"🔥 {reason}"
+
+
+def test_stored_reason_and_display_text_are_kept():
+    signal = {'reason': 'stored reason', 'display_text': 'stored text', 'breakout_type': 'HIGH_BREAK'}
+    assert breakout_reason(signal) == 'stored reason'
+    assert breakout_display_text(signal) == 'stored text'
+
+
+def test_chart_endpoint_reports_high_break_as_high(monkeypatch):
+    pytest.importorskip("fastapi")
+    from app.api.v1 import signals as signals_api
+
+    async def fake_signal_history(limit=50):
+        return [dict(HIGH_BREAK_SIGNAL)]
+
+    monkeypatch.setattr(signals_api.signal_detection_service, "get_signal_history", fake_signal_history)
+
+    response = asyncio.run(signals_api.get_chart_signals(
+        "NIFTY", date="2025-08-04", timeframe="5m", group_by_session=False
+    ))
+    body = json.loads(response.body)
+
+    assert body["count"] == 1
+    chart_signal = body["signals"][0]
+    assert chart_signal["breakout_type"] == "HIGH"
+    assert chart_signal["reason"] == breakout_reason(HIGH_BREAK_SIGNAL)
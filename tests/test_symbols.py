@@ -0,0 +1,34 @@
+"""SymbolsConfig shares its derived collections, so they must not be mutable"""
+
+import dataclasses
+
+import pytest
+
+from app.core.symbols import SymbolsConfig
+
+
+def test_shared_symbol_collections_cannot_be_mutated():
+    with pytest.raises(AttributeError):
+        SymbolsConfig.get_symbol_names().append('BANKNIFTY')
+    with pytest.raises(AttributeError):
+        SymbolsConfig.get_all_symbols().sort()
+    with pytest.raises(TypeError):
+        SymbolsConfig.get_token_to_symbol_map()['99926000'] = 'BANKNIFTY'
+    with pytest.raises(TypeError):
+        del SymbolsConfig.get_symbol_to_token_map()['NIFTY']
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        SymbolsConfig.get_all_symbols()[0].token = '0'
+
+    assert SymbolsConfig.get_symbol_names() == ('NIFTY', 'NIFTY30SEP25FUT')
+    assert SymbolsConfig.get_token_to_symbol_map()['99926000'] == 'NIFTY'
+
+
+def test_market_tokens_are_a_fresh_copy_per_call():
+    market_tokens = SymbolsConfig.get_market_tokens()
+    market_tokens.append({'exchangeType': 2, 'tokens': ['12345']})
+    market_tokens[0]['tokens'].append('12345')
+
+    assert SymbolsConfig.get_market_tokens() == [
+        {'exchangeType': 1, 'tokens': ['99926000']},
+        {'exchangeType': 2, 'tokens': ['53001']},
+    ]
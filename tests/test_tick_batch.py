@@ -0,0 +1,78 @@
+"""store_tick_batch waits for its own ticks to be written, not for the shards to go idle"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+from app.services.tick_data_service import TickDataService
+
+
+class _SlowCollection:
+    """insert_many that takes a moment, like a real round trip"""
+
+    def __init__(self):
+        self.inserted = []
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(0.01)
+        self.inserted.extend(docs)
+
+
+def _service(collection):
+    service = TickDataService()
+    service.collection = collection
+    service.buffer_timeout = 0.05
+    service._market_is_open = lambda: True
+    service._broadcast_tick = lambda tick_doc: None
+
+    async def no_counts(symbol_counts):
+        return None
+
+    service._update_tick_counts = no_counts
+    return service
+
+
+def test_batch_returns_under_a_steady_feed_on_the_same_shard():
+    async def run():
+        collection = _SlowCollection()
+        service = _service(collection)
+        feeding = True
+
+        async def steady_feed():
+            # Keeps the NIFTY shard from ever reaching zero pending ticks
+            n = 0
+            while feeding:
+                n += 1
+                service._enqueue_for_flush({'_id': f"feed:{n}", 'symbol': 'NIFTY', 'price': 1.0})
+                await asyncio.sleep(0.001)
+
+        feeder = asyncio.create_task(steady_feed())
+        await asyncio.sleep(0.02)
+
+        stored = await asyncio.wait_for(
+            service.store_tick_batch([{'symbol': 'NIFTY', 'ltpc': 24650.5}]), timeout=2
+        )
+        feeding = False
+        await feeder
+
+        assert stored == 1
+        assert any(doc['symbol'] == 'NIFTY' and doc.get('price') == 24650.5 for doc in collection.inserted)
+
+    asyncio.run(run())
+
+
+def test_batch_only_waits_for_the_shards_it_touched():
+    async def run():
+        service = _service(_SlowCollection())
+        stored = await asyncio.wait_for(
+            service.store_tick_batch([{'symbol': 'NIFTY', 'ltpc': 24650.5}]), timeout=2
+        )
+        assert stored == 1
+        touched = [shard for shard in service.shards if shard.appended]
+        assert len(touched) == 1
+        assert touched[0].written == touched[0].appended
+
+    asyncio.run(run())
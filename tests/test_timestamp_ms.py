@@ -0,0 +1,43 @@
+"""timestamp_ms is the true epoch for naive-IST datetimes, whatever the host time zone"""
+
+import time
+from datetime import datetime
+
+import pytest
+
+from app.utils.timezone_utils import TimezoneUtils, IST
+
+# 2025-08-04 09:15:00.123 IST == 03:45:00.123 UTC
+NAIVE_IST = datetime(2025, 8, 4, 9, 15, 0, 123000)
+EPOCH_MS = 1754279100123
+
+
+@pytest.fixture
+def utc_host(monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset is not available on this platform")
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_naive_ist_converts_with_the_fixed_offset_on_a_utc_host(utc_host):
+    assert TimezoneUtils.ist_to_unix_ms(NAIVE_IST) == EPOCH_MS
+
+
+def test_aware_and_naive_ist_give_the_same_epoch(utc_host):
+    assert TimezoneUtils.ist_to_unix_ms(NAIVE_IST.replace(tzinfo=IST)) == EPOCH_MS
+
+
+def test_tick_doc_timestamp_ms_and_id_on_a_utc_host(utc_host):
+    pytest.importorskip("motor")
+    pytest.importorskip("fastapi")
+    from app.services.tick_data_service import TickDataService
+
+    service = TickDataService()
+    tick_doc = service._build_tick_doc('NIFTY', 24650.5, NAIVE_IST, NAIVE_IST, {})
+
+    assert tick_doc['timestamp_ms'] == EPOCH_MS
+    assert tick_doc['_id'] == f"NIFTY:{EPOCH_MS}"
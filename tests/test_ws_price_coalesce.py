@@ -0,0 +1,56 @@
+"""price_update coalescing - off by default, latest value per symbol when enabled"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app import ws
+from app.core.config import settings
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent_updates = []
+
+    async def record_send(symbol, data):
+        sent_updates.append((symbol, data['ltpc']))
+
+    monkeypatch.setattr(ws, "_send_price_update", record_send)
+    monkeypatch.setitem(ws.manager.symbol_subscriptions, 'NIFTY', set())
+    monkeypatch.setitem(ws.manager.symbol_subscriptions, 'NIFTY30SEP25FUT', set())
+    monkeypatch.setattr(ws, "_price_flush_task", None)
+    ws._pending_price_updates.clear()
+    return sent_updates
+
+
+def test_every_update_is_sent_by_default(sent):
+    assert settings.ws_price_coalesce_ms == 0
+
+    async def run():
+        for price in (100.0, 101.0, 102.0):
+            await ws.broadcast_price_update('NIFTY', {'ltpc': price})
+
+    asyncio.run(run())
+    assert sent == [('NIFTY', 100.0), ('NIFTY', 101.0), ('NIFTY', 102.0)]
+    assert ws._price_flush_task is None
+
+
+def test_flush_sends_latest_update_per_symbol_then_exits(sent, monkeypatch):
+    monkeypatch.setattr(settings, "ws_price_coalesce_ms", 10)
+
+    async def run():
+        for price in (100.0, 101.0, 102.0):
+            await ws.broadcast_price_update('NIFTY', {'ltpc': price})
+        await ws.broadcast_price_update('NIFTY30SEP25FUT', {'ltpc': 200.0})
+
+        flush_task = ws._price_flush_task
+        assert sent == []  # Nothing goes out before the window elapses
+        await asyncio.wait_for(flush_task, timeout=1)
+        return flush_task
+
+    flush_task = asyncio.run(run())
+    assert sorted(sent) == [('NIFTY', 102.0), ('NIFTY30SEP25FUT', 200.0)]
+    assert flush_task.done()
+    assert not ws._pending_price_updates
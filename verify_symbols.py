@@ -6,52 +6,63 @@ This script checks what symbols are configured vs what's stored in the database
 
 import sys
 import os
+from collections import Counter
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.core.symbols import SymbolsConfig
 
 def main():
-    print("=" * 60)
-    print("NIFTY-ONLY TRADING SYMBOLS VERIFICATION")
-    print("=" * 60)
+    # Collect every line, then write once - one stdout write instead of one per line
+    out = []
     
-    print("\n1. CONFIGURED SYMBOLS:")
-    print("-" * 30)
+    out.append("=" * 60)
+    out.append("NIFTY-ONLY TRADING SYMBOLS VERIFICATION")
+    out.append("=" * 60)
+    
+    out.append("\n1. CONFIGURED SYMBOLS:")
+    out.append("-" * 30)
     symbols = SymbolsConfig.get_all_symbols()
     for symbol in symbols:
-        print(f"   {symbol.symbol:<20} | Token: {symbol.token:<10} | {symbol.name}")
-        print(f"   Exchange: {symbol.exchange:<10} | Type: {symbol.instrument_type}")
-        print()
+        # Bind each attribute once for the f-strings below
+        name, token, full_name = symbol.symbol, symbol.token, symbol.name
+        exchange, instrument_type = symbol.exchange, symbol.instrument_type
+        out.append(f"   {name:<20} | Token: {token:<10} | {full_name}")
+        out.append(f"   Exchange: {exchange:<10} | Type: {instrument_type}")
+        out.append("")
     
-    print("2. WEBSOCKET SUBSCRIPTION TOKENS:")
-    print("-" * 30)
+    out.append("2. WEBSOCKET SUBSCRIPTION TOKENS:")
+    out.append("-" * 30)
     market_tokens = SymbolsConfig.get_market_tokens()
     for i, token_group in enumerate(market_tokens, 1):
         exchange_name = "NSE" if token_group["exchangeType"] == 1 else "NFO"
-        print(f"   {i}. {exchange_name} Exchange (Type {token_group['exchangeType']}): {token_group['tokens']}")
+        out.append(f"   {i}. {exchange_name} Exchange (Type {token_group['exchangeType']}): {token_group['tokens']}")
     
-    print("\n3. TOKEN MAPPINGS:")
-    print("-" * 30)
+    out.append("\n3. TOKEN MAPPINGS:")
+    out.append("-" * 30)
     token_map = SymbolsConfig.get_token_to_symbol_map()
     for token, symbol in token_map.items():
-        print(f"   Token {token} -> {symbol}")
+        out.append(f"   Token {token} -> {symbol}")
     
-    print("\n4. SYMBOL NAMES LIST:")
-    print("-" * 30)
+    out.append("\n4. SYMBOL NAMES LIST:")
+    out.append("-" * 30)
     symbol_names = SymbolsConfig.get_symbol_names()
-    print(f"   Configured symbols: {symbol_names}")
-    
-    print("\n5. SUMMARY:")
-    print("-" * 30)
-    print(f"   Total symbols configured: {len(symbols)}")
-    print(f"   Index symbols: {len([s for s in symbols if s.instrument_type == 'INDEX'])}")
-    print(f"   Futures symbols: {len([s for s in symbols if s.instrument_type == 'FUTIDX'])}")
-    print(f"   WebSocket subscriptions: {len(market_tokens)}")
-    
-    print("\n✅ Configuration updated to NIFTY Index + NIFTY Futures ONLY")
-    print("✅ Removed: BANKNIFTY, FINNIFTY, SENSEX")
-    print("✅ Clean, focused trading setup for NIFTY-only strategy")
-    print("=" * 60)
+    out.append(f"   Configured symbols: {list(symbol_names)}")
+    
+    out.append("\n5. SUMMARY:")
+    out.append("-" * 30)
+    # One pass over the symbols for every instrument type count
+    type_counts = Counter(s.instrument_type for s in symbols)
+    out.append(f"   Total symbols configured: {len(symbols)}")
+    out.append(f"   Index symbols: {type_counts['INDEX']}")
+    out.append(f"   Futures symbols: {type_counts['FUTIDX']}")
+    out.append(f"   WebSocket subscriptions: {len(market_tokens)}")
+    
+    out.append("\n✅ Configuration updated to NIFTY Index + NIFTY Futures ONLY")
+    out.append("✅ Removed: BANKNIFTY, FINNIFTY, SENSEX")
+    out.append("✅ Clean, focused trading setup for NIFTY-only strategy")
+    out.append("=" * 60)
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file